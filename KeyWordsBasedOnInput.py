@@ -1,45 +1,85 @@
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
 import os
 import time
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
+import asyncio
+import json
+import re
 from dotenv import load_dotenv
+from query_runner import estimate_tokens, get_rate_limiter, pack_batches, run_concurrently, run_with_retries
+from trends_fetcher import TRENDS_URL, fetch_trends
+from driver_pool import get_driver_pool
+from sheets_gateway import CREDENTIALS_FILE, get_gateway
+from sheet_watcher import InputSheetWatcher, watch
+from sheet_writer import SheetUpdate, cell_key, get_sheet_writer, grid_cells
+from change_detector import get_change_detector
+from llm_cache import acached_invoke, cached_invoke, get_llm_cache
+from llm_client import get_chat_model, run_async
+from arabic_text import dedupe_keywords
+from keyword_stream import parse_keywords
+import metrics
+from metrics import instrumented
 load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
-# Initialize the OpenAI model
-model = ChatOpenAI(model='gpt-4o', temperature=0.5)
+# Query execution settings ("async" fans queries out concurrently, "sequential" runs them one by one,
+# "batched" packs several queries into each request around one shared trends context)
+EXECUTION_MODE = os.getenv("INPUT_EXECUTION_MODE", "async")
+BATCH_TOKEN_BUDGET = int(os.getenv("INPUT_BATCH_TOKEN_BUDGET", "16000"))
+BATCH_MAX_OUTPUT_TOKENS = int(os.getenv("INPUT_BATCH_MAX_OUTPUT_TOKENS", "4000"))
+BATCH_MAX_QUERIES = int(os.getenv("INPUT_BATCH_MAX_QUERIES", "25"))
+KEYWORD_TOKENS_PER_QUERY = 250  # ~30 Arabic keywords plus JSON punctuation
+QUERY_CONCURRENCY = int(os.getenv("INPUT_QUERY_CONCURRENCY", "8"))
+QUERY_MAX_RETRIES = int(os.getenv("INPUT_QUERY_MAX_RETRIES", "3"))
+
+# Comma-separated list of input spreadsheets watched by this process
+INPUT_SHEET_NAMES = [name.strip() for name in os.getenv(
+    "INPUT_SHEET_NAMES", "Trending Keywords Saudi Based on Input").split(",") if name.strip()]
+
+# OpenAI model, built on first use (set this to use a different chat model)
+model = None
+
+
+def get_model():
+    return model or get_chat_model(temperature=0.5)
+
+
+# Function to check the settings the input job needs (nothing is checked at import time)
+def check_config():
+    if not OPENAI_API_KEY:
+        raise ValueError("Error: OPENAI_API_KEY is missing. Set it in your environment variables.")
+    if not os.path.exists(CREDENTIALS_FILE):
+        raise ValueError(f"Error: Google service account file '{CREDENTIALS_FILE}' is missing.")
 
 # Function to scrape trending topics in Saudi Arabia
+@instrumented("scrape")
 def scrape_saudi_trends():
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
+    # Plain HTTP first; Chrome is only started when that returns nothing
+    trending_topics = fetch_trends(TRENDS_URL)
+    if trending_topics:
+        return trending_topics
+
+    print("HTTP fetch returned no trends, falling back to Selenium...")
+    return scrape_saudi_trends_selenium(TRENDS_URL)
+
+
+def scrape_saudi_trends_selenium(url=TRENDS_URL):
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
 
-    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options)
     try:
-        driver.get("https://getdaytrends.com/saudi-arabia/")
-        driver.implicitly_wait(10)
-        trends = driver.find_elements(By.CSS_SELECTOR, "td.main")
-        trending_topics = [trend.text for trend in trends if trend.text.strip()]
-        return trending_topics
+        # Pooled drivers are shared, so wait explicitly instead of setting an implicit wait on them
+        with get_driver_pool().lease() as driver:
+            driver.get(url)
+            WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.CSS_SELECTOR, "td.main")))
+            trends = driver.find_elements(By.CSS_SELECTOR, "td.main")
+            trending_topics = [trend.text for trend in trends if trend.text.strip()]
+            return trending_topics
     except Exception as e:
         print(f"Error occurred: {e}")
         return []
-    finally:
-        driver.quit()
 
-# Function to process the trends list with the enhanced prompt
-def get_top_30_keywords(trending_topics, query, model):
-    template = """
+
+TOP_KEYWORDS_TEMPLATE = """
     I have the following marketing query: "{query}". 
     Generate a list of the **most relevant and localized Arabic Saudi Arabia keywords** strictly related to this query. 
     You may use these Saudi Arabia trending topics for inspiration: {trending_topics}. 
@@ -49,150 +89,257 @@ def get_top_30_keywords(trending_topics, query, model):
     """
 
 
-    prompt = ChatPromptTemplate.from_template(template)
-    chain = prompt | model
+# Function to process the trends list with the enhanced prompt
+@instrumented("llm:top_keywords")
+def get_top_30_keywords(trending_topics, query, model):
+    # Pass trending_topics and query correctly; resubmitted queries come from the cache
+    return cached_invoke(TOP_KEYWORDS_TEMPLATE, model, {"trending_topics": trending_topics, "query": query},
+                         validate=has_keywords)
 
-    # Pass trending_topics and query correctly
-    return chain.invoke({"trending_topics": trending_topics, "query": query}).content
 
+# Async variant of get_top_30_keywords used by the concurrent fan-out
+@instrumented("llm:top_keywords")
+async def aget_top_30_keywords(trending_topics, query, model, limiter=None, tokens=None):
+    return await acached_invoke(TOP_KEYWORDS_TEMPLATE, model, {"trending_topics": trending_topics, "query": query},
+                                limiter=limiter, tokens=tokens, validate=has_keywords)
 
-# Function to update Google Sheet
-def update_google_sheet(sheet_name, query_keyword_map, client):
-    try:
-        sheet = client.open(sheet_name).worksheet("OUTPUT")
 
-        # Clear the sheet before writing
-        sheet.clear()
+def split_keywords(keywords):
+    return parse_keywords(keywords)
 
-        # Write the headers
-        sheet.update("A1", [["Query", "Keywords"]])  # Headers in Row 1
 
-        # Prepare rows for each query and its keywords
-        rows = []
-        for query, keywords in query_keyword_map.items():
-            rows.append([query, ", ".join(keywords)])  # Convert keyword list to comma-separated string
+# Function to check a completion before it is cached: an empty or junk answer is not kept
+def has_keywords(content):
+    return bool(parse_keywords(content))
 
-        # Update the sheet with new rows starting from row 2
-        sheet.update("A2", rows)
 
-        print("Google Sheet updated successfully!")
+BATCH_KEYWORDS_TEMPLATE = """
+    I have the following marketing queries, one per line as "<id>: <query>":
+    {queries}
 
-    except gspread.exceptions.SpreadsheetNotFound:
-        print(f"Error: Google Sheet '{sheet_name}' not found. Check the name and permissions.")
-    except Exception as e:
-        print(f"An unexpected error occurred: {e}")
+    For EACH query, generate a list of the **most relevant and localized Arabic Saudi Arabia keywords** strictly related to that query.
+    You may use these Saudi Arabia trending topics for inspiration: {trending_topics}.
+    Ensure all generated keywords are directly related to their query and avoid unrelated trending topics.
+    It's better that the keywords to be single word.
+    Return ONLY a JSON object mapping every query id to its list of keywords, for example:
+    {{"q1": ["keyword", "keyword"], "q2": ["keyword", "keyword"]}}
+    """
 
+# One complete `"q<n>": [...]` entry, used to salvage truncated JSON
+BATCH_ENTRY_RE = re.compile(r'"(q\d+)"\s*:\s*(\[[^\]]*\])')
 
 
-def is_cell_ready(sheet_name,client):
+def parse_batch_response(content, batch):
+    """Map a batched JSON response back to {query: [keywords]}; unanswered queries are left out."""
+    ids = {f"q{i}": query for i, query in enumerate(batch, 1)}
     try:
-        # Open the Google Sheet and select the sheet named 'OUTPUT'
-        sheet = client.open(sheet_name).worksheet('INPUT')
+        entries = json.loads(content.strip().strip("`").removeprefix("json")).items()
+    except (json.JSONDecodeError, AttributeError):
+        entries = []
+        for match in BATCH_ENTRY_RE.finditer(content):
+            try:
+                entries.append((match.group(1), json.loads(match.group(2))))
+            except json.JSONDecodeError:
+                continue
+
+    results = {}
+    for query_id, keywords in entries:
+        if query_id in ids and isinstance(keywords, list):
+            keywords = dedupe_keywords(kw for kw in keywords if isinstance(kw, str))
+            if keywords:
+                results[ids[query_id]] = keywords
+    return results
+
+
+@instrumented("llm:batch_keywords")
+async def aget_batch_keywords(trending_topics, batch, model, limiter=None, tokens=None):
+    json_model = model.bind(response_format={"type": "json_object"})
+    content = await acached_invoke(BATCH_KEYWORDS_TEMPLATE, json_model, {
+        "trending_topics": trending_topics,
+        "queries": "\n".join(f"q{i}: {query}" for i, query in enumerate(batch, 1)),
+    }, limiter=limiter, tokens=tokens,
+        validate=lambda content: len(parse_batch_response(content, batch)) == len(batch))  # only full answers are cached
+    return parse_batch_response(content, batch)
+
+
+# Function to generate keywords with several queries per request
+def generate_query_keywords_batched(trending_topics, queries, model, concurrency=None, limiter=None):
+    """Batched variant of generate_query_keywords.
+
+    Queries are packed into batches that fit BATCH_TOKEN_BUDGET. Queries a batch
+    fails to answer (error or truncated JSON) are split in half and retried;
+    a single leftover query falls back to the one-query prompt.
+    """
+    if limiter is None:
+        limiter = get_rate_limiter()
+    fixed_tokens = estimate_tokens(BATCH_KEYWORDS_TEMPLATE + trending_topics)
+    batches = pack_batches(queries, BATCH_TOKEN_BUDGET, fixed_tokens, KEYWORD_TOKENS_PER_QUERY,
+                           BATCH_MAX_OUTPUT_TOKENS, BATCH_MAX_QUERIES)
+    print(f"Packed {len(queries)} queries into {len(batches)} requests.")
+
+    async def resolve(batch, semaphore):
+        # The limiter is charged on cache misses only (see acached_invoke), so cached batches don't wait
+        tokens = fixed_tokens + sum(estimate_tokens(q) + KEYWORD_TOKENS_PER_QUERY for q in batch)
+        try:
+            if len(batch) == 1:
+                keywords = await run_with_retries(
+                    batch[0], lambda query: aget_top_30_keywords(trending_topics, query, model, limiter, tokens),
+                    semaphore, max_retries=QUERY_MAX_RETRIES)
+                return {batch[0]: split_keywords(keywords)}
+            results = await run_with_retries(
+                batch, lambda items: aget_batch_keywords(trending_topics, items, model, limiter, tokens),
+                semaphore, max_retries=QUERY_MAX_RETRIES)
+        except Exception as e:
+            if len(batch) == 1:
+                print(f"Error processing query '{batch[0]}': {e}")
+                return {}
+            print(f"Batch of {len(batch)} queries failed ({e}), splitting it.")
+            results = {}
+
+        missing = [query for query in batch if query not in results]
+        if missing:
+            middle = (len(missing) + 1) // 2
+            halves = [half for half in (missing[:middle], missing[middle:]) if half]
+            for retried in await asyncio.gather(*(resolve(half, semaphore) for half in halves)):
+                results.update(retried)
+        return results
+
+    async def run_all():
+        semaphore = asyncio.Semaphore(max(1, concurrency or QUERY_CONCURRENCY))
+        return await asyncio.gather(*(resolve(batch, semaphore) for batch in batches))
+
+    merged = {}
+    for results in run_async(run_all()):
+        merged.update(results)
+    return {query: merged[query] for query in queries if query in merged}
+
+
+# Function to generate keywords for every query, sequentially or concurrently
+@instrumented("generate_query_keywords")
+def generate_query_keywords(trending_topics, queries, model, mode=None, concurrency=None, limiter=None):
+    """Return a {query: [keywords]} map in input order; failed queries are left out."""
+    mode = mode or EXECUTION_MODE
+    query_keyword_map = {}
+
+    if mode == "batched":
+        return generate_query_keywords_batched(trending_topics, queries, model, concurrency, limiter)
+
+    if mode == "sequential":
+        for query in queries:
+            try:
+                keywords = get_top_30_keywords(trending_topics, query, model)
+                query_keyword_map[query] = split_keywords(keywords)
+            except Exception as e:
+                print(f"Error processing query '{query}': {e}")
+        return query_keyword_map
+
+    if limiter is None:
+        limiter = get_rate_limiter()
+    tokens_per_call = estimate_tokens(TOP_KEYWORDS_TEMPLATE + trending_topics) + 300  # prompt + expected completion
+
+    # The limiter is charged on cache misses only (see acached_invoke), so cached queries don't wait
+    async def invoke(query):
+        return await aget_top_30_keywords(trending_topics, query, model, limiter, tokens_per_call)
+
+    results = run_async(run_concurrently(
+        queries, invoke,
+        concurrency=concurrency or QUERY_CONCURRENCY,
+        max_retries=QUERY_MAX_RETRIES,
+    ))
+
+    for query, result in zip(queries, results):
+        if isinstance(result, Exception):
+            print(f"Error processing query '{query}': {result}")
+        else:
+            query_keyword_map[query] = split_keywords(result)
+    return query_keyword_map
 
-        # Get the value of cell D2
-        cell_value = sheet.acell('D2').value
 
-        # Check if the value is "Ready"
-        return cell_value == "Ready"
+# Function to update Google Sheet
+@instrumented("sheet_write:output")
+def update_google_sheet(sheet_name, query_keyword_map, gateway, status_cells=None):
+    import gspread
+
+    try:
+        # Headers in Row 1, then one row per query
+        rows = [["Query", "Keywords"]]
+        for query, keywords in query_keyword_map.items():
+            rows.append([query, ", ".join(keywords)])  # Convert keyword list to comma-separated string
+
+        # Only changed cells are sent (rows left over from a longer previous run are blanked),
+        # together with the INPUT status cells, in a single batched request -- no clear() gap
+        updates = [SheetUpdate("OUTPUT", grid_cells(rows), region=(1, 1, 2))]
+        if status_cells:
+            updates.append(SheetUpdate("INPUT", {cell_key(label): value for label, value in status_cells.items()},
+                                       force=True))
+        get_sheet_writer(gateway).write(sheet_name, updates)
+
+        print("Google Sheet updated successfully!")
+        return True
 
     except gspread.exceptions.SpreadsheetNotFound:
         print(f"Error: Google Sheet '{sheet_name}' not found. Check the name and permissions.")
-        return False
-    except gspread.exceptions.WorksheetNotFound:
-        print(f"Error: Worksheet 'OUTPUT' not found in the Google Sheet '{sheet_name}'.")
-        return False
+        gateway.invalidate(sheet_name)
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
-        return False
+        gateway.drop_stale(sheet_name, e)
+    return False
 
 
-def update_cell(sheet_name, cell_address, value,client):
-    try:
+# Function to run the keyword job for one input sheet
+def run_input_job(sheet_name, queries, gateway):
+    """Generate keywords for the sheet's queries and write them to OUTPUT. Returns False if skipped."""
+    start_time = time.time()
+    api_calls_before = gateway.total_api_calls()
 
-        # Open the Google Sheet and worksheet
-        sheet = client.open(sheet_name)
-        worksheet = sheet.worksheet("INPUT")
+    # Scrape trending topics
+    saudi_trends = scrape_saudi_trends()
+    if not saudi_trends:
+        print("No trending topics found. Skipping this run.")
+        return False
 
-        # Update the specified cell
-        worksheet.update_acell(cell_address, value)
+    trending_topics = ", ".join(saudi_trends)
 
-        print(f"Updated cell {cell_address} in worksheet 'OUTPUT' with value: {value}")
-    except gspread.exceptions.SpreadsheetNotFound:
-        print(f"Error: Google Sheet '{sheet_name}' not found. Check the name and permissions.")
-    except gspread.exceptions.WorksheetNotFound:
-        print(f"Error: Worksheet 'OUTPUT' not found in the Google Sheet '{sheet_name}'.")
-    except Exception as e:
-        print(f"An unexpected error occurred: {e}")
+    if not queries:
+        print("No queries found. Skipping this run.")
+        return False
 
+    # Generate keywords only for queries that are new, unless the trends moved enough to redo all of them
+    # (the first row is the header, so skip it)
+    detector = get_change_detector()
+    to_generate, reused = detector.plan_queries(sheet_name, saudi_trends, queries[1:])
+    generated = generate_query_keywords(trending_topics, to_generate, get_model()) if to_generate else {}
+    query_keyword_map = {
+        query: generated[query] if query in generated else reused[query]
+        for query in queries[1:] if query in generated or query in reused
+    }
+
+    # Update Google Sheet and mark as done in the same request
+    if not update_google_sheet(sheet_name, query_keyword_map, gateway, status_cells={"D2": "Not Ready", "C2": "Done"}):
+        return False
+    # Reused results were generated against the old trends, so keep that baseline until a full run
+    detector.commit(sheet_name, None if reused else saudi_trends, results=query_keyword_map)
 
-def get_queries(sheet_name, client, column="A"):
-    try:
-        # Open the sheet and worksheet
-        sheet = client.open(sheet_name)
-        worksheet = sheet.worksheet("INPUT")
+    print(f"Execution time: {time.time() - start_time:.2f} seconds.")
+    print(f"Google Sheets API calls: {gateway.total_api_calls() - api_calls_before}")
+    print(f"LLM cache: {get_llm_cache().stats()}")
+    return True
 
-        # Fetch all values from the specified column
-        queries = worksheet.col_values(ord(column.upper()) - 64)  # Convert column letter to number
-        return [query.strip() for query in queries if query.strip()]  # Remove empty strings
 
-    except gspread.exceptions.SpreadsheetNotFound:
-        print(f"Error: Google Sheet '{sheet_name}' not found. Check the name and permissions.")
-        return []
-    except gspread.exceptions.WorksheetNotFound:
-        print(f"Error: Worksheet 'INPUT' not found in the Google Sheet '{sheet_name}'.")
-        return []
-    except Exception as e:
-        print(f"An unexpected error occurred: {e}")
-        return []
+# Function to run the job for a watcher that just became ready (the unit the scheduler runs)
+def run_input_cycle(watcher, queries):
+    print(f"'{watcher.sheet_name}' is Ready, generating keywords...")
+    with metrics.cycle("input"):
+        return run_input_job(watcher.sheet_name, queries, get_gateway())
 
 
 # Main execution
 if __name__ == "__main__":
-    # Authenticate and connect to Google Sheets
-    scope = ["https://www.googleapis.com/auth/drive"]
-    creds = ServiceAccountCredentials.from_json_keyfile_name('credentials.json', scope)
-    client = gspread.authorize(creds)
-
-    sheet_name = "Trending Keywords Saudi Based on Input"
-
-    while True:
-        update_cell(sheet_name, "C2", "", client)
-        if is_cell_ready(sheet_name, client):
-            start_time = time.time()
-
-            # Scrape trending topics
-            saudi_trends = scrape_saudi_trends()
-            if not saudi_trends:
-                print("No trending topics found. Exiting.")
-                break
-
-            trending_topics = ", ".join(saudi_trends)
-
-            # Fetch queries from the sheet
-            queries = get_queries(sheet_name, client)
-            if not queries:
-                print("No queries found. Exiting.")
-                break
-
-            # Generate keywords for each query
-            query_keyword_map = {}
-            for query in queries:
-                try:
-                    keywords = get_top_30_keywords(trending_topics, query, model)
-                    query_keyword_map[query] = [kw.strip() for kw in keywords.split(",") if kw.strip()]
-                except Exception as e:
-                    print(f"Error processing query '{query}': {e}")
-
-            # Update Google Sheet
-            # remove the first row from the query_keyword_map
-            query_keyword_map.pop(queries[0])
-            update_google_sheet(sheet_name, query_keyword_map, client)
-
-            # Mark as done
-            update_cell(sheet_name, "D2", "Not Ready", client)
-            update_cell(sheet_name, "C2", "Done", client)
-
-            print(f"Execution time: {time.time() - start_time:.2f} seconds.")
-        else:
-            print("Cell D2 is not ready. Waiting for input...")
-        time.sleep(10)
+    check_config()
+
+    # Authenticate once and reuse the cached sheet handles
+    gateway = get_gateway()
+
+    # One watcher per input sheet; each tick is a single batched read of D2 and column A
+    watchers = [InputSheetWatcher(sheet_name, gateway) for sheet_name in INPUT_SHEET_NAMES]
+    watch(watchers, run_input_cycle)
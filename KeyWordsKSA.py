@@ -1,21 +1,27 @@
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
 import os
 import time
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
 from dotenv import load_dotenv
-import requests
 import json
 import re
+import threading
 from datetime import datetime
+from trends_fetcher import TRENDS_URL, fetch_trends, get_http_session
+from driver_pool import get_driver_pool
+from sheets_gateway import CREDENTIALS_FILE, get_gateway
+from sheet_writer import SheetUpdate, cell_key, get_sheet_writer, grid_cells
+from llm_cache import cached_invoke, get_llm_cache
+from keyword_stream import KeywordStream, parse_keywords, stream_keywords, top_up_keywords
+from ingestion import Source, run_sources
+from change_detector import fingerprint, get_change_detector
+from llm_client import get_chat_model
+from query_runner import get_rate_limiter
+from regions import REGIONS, get_regions, run_regions
+from trend_ranker import rank_trends
+from arabic_text import KeywordIndex
+from checkpoints import load_checkpoint, open_checkpoint
+from trend_archive import VELOCITY_WINDOW_HOURS, get_trend_archive
+import metrics
+from metrics import instrumented
 
 # Load environment variables
 load_dotenv()
@@ -24,26 +30,67 @@ load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 WEATHER_API_KEY = os.getenv("WEATHER_API_KEY")
 
-if not OPENAI_API_KEY:
-    raise ValueError("Error: OPENAI_API_KEY is missing. Set it in your environment variables.")
-if not WEATHER_API_KEY:
-    raise ValueError("Error: WEATHER_API_KEY is missing. Set it in your environment variables.")
-
 # API URL and File Path
-API_URL = f"https://weather.visualcrossing.com/VisualCrossingWebServices/rest/services/timeline/riyadh?unitGroup=metric&key={WEATHER_API_KEY}&contentType=json"
-FILE_PATH = "weather_data.txt"
+API_URL = "https://weather.visualcrossing.com/VisualCrossingWebServices/rest/services/timeline/{location}?unitGroup=metric&key={key}&contentType=json"
+FILE_PATH = "weather_data_{location}.txt"
+HISTORY_CACHE_PATH = "historical_keywords_cache.json"
+
+# Regions processed every cycle (see regions.py); the default "ksa" region uses the original sheets
+KSA_REGIONS = os.getenv("KSA_REGIONS", "ksa")
+DEFAULT_REGION = REGIONS["ksa"]
+HISTORY_SHEET_NAME = DEFAULT_REGION.history_sheet
+TARGET_SHEET_NAME = DEFAULT_REGION.target_sheet
+HISTORY_DAYS = 1
+
+# Ingestion stage: per-source deadlines (seconds) and fallbacks
+TRENDS_TIMEOUT = int(os.getenv("TRENDS_TIMEOUT", "60"))
+HISTORY_TIMEOUT = int(os.getenv("HISTORY_TIMEOUT", "30"))
+WEATHER_TIMEOUT = int(os.getenv("WEATHER_TIMEOUT", "15"))
+DEFAULT_WEATHER = "الطقس معتدل"
+
+# Schedule: run every KSA_INTERVAL_SECONDS, or on KSA_CRON (e.g. "0 */5 * * *") when set
+KSA_INTERVAL_SECONDS = int(os.getenv("KSA_INTERVAL_SECONDS", "18000"))
+KSA_CRON = os.getenv("KSA_CRON", "")
+# A failed region cycle is resumed from its checkpoint up to KSA_CYCLE_RETRIES times
+KSA_CYCLE_RETRIES = int(os.getenv("KSA_CYCLE_RETRIES", "2"))
+KSA_RETRY_DELAY = int(os.getenv("KSA_RETRY_DELAY", "60"))
+
+# "chain" runs the three agents in sequence, "fused" does the same job in one JSON-mode call
+PIPELINE_MODE = os.getenv("KSA_PIPELINE_MODE", "chain")
+MIN_KEYWORDS = 45
+MAX_KEYWORDS = 50
+
+# Rank prefix on history cells, e.g. "3 - مطر"
+RANK_PREFIX_RE = re.compile(r"^\d+\s*-\s*")
+KEYWORD_TIERS = ("High", "Medium", "Low")
 
-# Initialize OpenAI model
-model = ChatOpenAI(model='gpt-4o', temperature=0.2)
+# OpenAI model, built on first use (set this to use a different chat model)
+model = None
+
+
+def get_model():
+    return model or get_chat_model(temperature=0.2)
+
+
+# Function to check the settings a KSA run needs (nothing is checked at import time)
+def check_config():
+    if not OPENAI_API_KEY:
+        raise ValueError("Error: OPENAI_API_KEY is missing. Set it in your environment variables.")
+    if not WEATHER_API_KEY:
+        raise ValueError("Error: WEATHER_API_KEY is missing. Set it in your environment variables.")
+    if not os.path.exists(CREDENTIALS_FILE):
+        raise ValueError(f"Error: Google service account file '{CREDENTIALS_FILE}' is missing.")
 
 
 # Function to fetch weather data
-def get_weather_data():
+@instrumented("weather_fetch")
+def get_weather_data(location=DEFAULT_REGION.weather_location):
     today = datetime.now().strftime("%Y-%m-%d")
+    file_path = FILE_PATH.format(location=location)
 
-    if os.path.exists(FILE_PATH):
+    if os.path.exists(file_path):
         try:
-            with open(FILE_PATH, "r") as file:
+            with open(file_path, "r") as file:
                 saved_data = json.load(file)
                 if saved_data.get("date") == today:
                     print("Weather data is already saved for today.")
@@ -52,7 +99,9 @@ def get_weather_data():
             print("Warning: Corrupt weather data file. Refetching data...")
 
     print("Fetching new weather data from the API...")
-    response = requests.get(API_URL)
+    response = get_http_session().get(API_URL.format(location=location, key=WEATHER_API_KEY),
+                                      timeout=WEATHER_TIMEOUT)
+    metrics.add(api_calls=1, bytes=len(response.content))
 
     if response.status_code == 200:
         data = response.json()
@@ -65,7 +114,7 @@ def get_weather_data():
             "description": data["days"][0]["description"]
         }
 
-        with open(FILE_PATH, "w") as file:
+        with open(file_path, "w") as file:
             json.dump(weather_info, file, indent=4)
 
         print("Weather data saved successfully.")
@@ -74,105 +123,140 @@ def get_weather_data():
     print(f"Failed to fetch weather data. Status code: {response.status_code}")
     return None
 
-# Function to scrape trending topics in Saudi Arabia
-def scrape_saudi_trends():
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
+# Function to scrape trending topics in Saudi Arabia (or another region's trends page)
+@instrumented("scrape")
+def scrape_saudi_trends(url=TRENDS_URL):
+    """Read the trends over plain HTTP; only start Chrome if that returns nothing."""
+    trending_topics = fetch_trends(url)
+    if trending_topics:
+        return trending_topics
+
+    print("⚠️ HTTP fetch returned no trends, falling back to Selenium...")
+    return scrape_saudi_trends_selenium(url)
 
-    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options)
+
+def scrape_saudi_trends_selenium(url=TRENDS_URL):
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
 
     try:
-        driver.get("https://getdaytrends.com/saudi-arabia/")
-        WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.CSS_SELECTOR, "td.main")))
+        # Borrow a warm browser from the shared pool instead of starting a new one
+        with get_driver_pool().lease() as driver:
+            driver.get(url)
+            WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.CSS_SELECTOR, "td.main")))
 
-        trends = driver.find_elements(By.CSS_SELECTOR, "td.main")
-        trending_topics = [trend.text.strip() for trend in trends if trend.text.strip()]
+            trends = driver.find_elements(By.CSS_SELECTOR, "td.main")
+            trending_topics = [trend.text.strip() for trend in trends if trend.text.strip()]
 
-        return trending_topics
+            return trending_topics
 
     except Exception as e:
         print(f"Error occurred: {e}")
         return []
 
-    finally:
-        driver.quit()
+def _column_letter(column):
+    from gspread.utils import rowcol_to_a1
 
-def get_historical_keywords(sheet_name, days=3):
-    """Fetch historical keyword data dynamically, ensuring correct column detection from row 2."""
+    return rowcol_to_a1(1, column)[:-1]
+
+
+def parse_keyword_tiers(rows):
+    """Split High/Medium/Low columns (repeating every 3 columns) in one pass, without spelling-variant duplicates."""
+    tiers = {tier: KeywordIndex() for tier in KEYWORD_TIERS}
+    columns = [tiers[tier] for tier in KEYWORD_TIERS]
+    for row in rows:
+        for index, cell in enumerate(row):
+            if cell.strip():
+                columns[index % 3].add(RANK_PREFIX_RE.sub("", cell))
+    return {tier: index.keywords() for tier, index in tiers.items()}
+
+
+# Regions read and write the shared history cache file concurrently
+_history_cache_lock = threading.Lock()
+
+
+def _load_history_cache(sheet_name, days, modified):
+    if modified is None or not os.path.exists(HISTORY_CACHE_PATH):
+        return None
     try:
-        # Connect to Google Sheets
-        scope = ["https://www.googleapis.com/auth/drive"]
-        creds = ServiceAccountCredentials.from_json_keyfile_name('credentials.json', scope)
-        client = gspread.authorize(creds)
+        with _history_cache_lock, open(HISTORY_CACHE_PATH, "r") as file:
+            entry = json.load(file).get(sheet_name)
+    except (json.JSONDecodeError, OSError):
+        return None
+    if entry and entry.get("modified") == modified and entry.get("days") == days:
+        return entry["keywords"]
+    return None
 
-        sheet = client.open(sheet_name).worksheet("Keyword rate")  
-        data = sheet.get_all_values()  
 
-        if len(data) < 3:
-            raise ValueError("❌ The sheet doesn't have enough rows to extract data.")
+def _save_history_cache(sheet_name, days, modified, keywords):
+    if modified is None:
+        return
+    with _history_cache_lock:
+        cache = {}
+        if os.path.exists(HISTORY_CACHE_PATH):
+            try:
+                with open(HISTORY_CACHE_PATH, "r") as file:
+                    cache = json.load(file)
+            except (json.JSONDecodeError, OSError):
+                cache = {}
+        cache[sheet_name] = {"days": days, "modified": modified, "keywords": keywords}
+        with open(HISTORY_CACHE_PATH, "w") as file:
+            json.dump(cache, file, ensure_ascii=False, indent=4)
+
 
-        headers = data[1]  # ✅ Row 2 contains "High", "Medium", "Low"
+@instrumented("history_read")
+def get_historical_keywords(sheet_name, days=3):
+    """Fetch historical keyword data dynamically, ensuring correct column detection from row 2."""
+    try:
+        gateway = get_gateway()
+
+        # ✅ Skip the read entirely if the spreadsheet hasn't changed since the last one
+        try:
+            modified = gateway.last_modified(sheet_name)
+        except Exception as e:
+            print(f"⚠️ Could not read last-modified time, skipping history cache: {e}")
+            modified = None
+        cached = _load_history_cache(sheet_name, days, modified)
+        if cached is not None:
+            print("Historical keywords unchanged since last read, using local cache.")
+            return cached
+
+        # Shared, already-authorized Google Sheets connection
+        sheet = gateway.worksheet(sheet_name, "Keyword rate")
+
+        headers = sheet.row_values(2)  # ✅ Row 2 contains "High", "Medium", "Low"
         total_columns = len(headers)  # Get the total number of columns
 
         if total_columns < days * 3:
             raise ValueError("❌ Not enough columns to extract the last three days.")
 
-        historical_keywords = {"High": [], "Medium": [], "Low": []}
+        # ✅ Read only the last `days` column triples, from row 3 down
+        start_col = total_columns - (days * 3) + 1
+        rows = sheet.get(f"{_column_letter(start_col)}3:{_column_letter(total_columns)}")
 
-        # ✅ Extract data for the last `days`
-        start_col = total_columns - (days * 3)  # Start from the last three days
+        if not rows:
+            raise ValueError("❌ The sheet doesn't have enough rows to extract data.")
 
-        for i in range(start_col, total_columns, 3):  # Step by 3 columns per day (High, Medium, Low)
-            try:
-                high_col_index = i
-                medium_col_index = i + 1
-                low_col_index = i + 2
-                high_keywords = [
-                    re.sub(r"^\d+\s*-\s*", "", row[high_col_index])  
-                    for row in data[2:] if len(row) > high_col_index and row[high_col_index].strip()
-                ]
-                medium_keywords = [
-                    re.sub(r"^\d+\s*-\s*", "", row[medium_col_index])
-                    for row in data[2:] if len(row) > medium_col_index and row[medium_col_index].strip()
-                ]
-                low_keywords = [
-                    re.sub(r"^\d+\s*-\s*", "", row[low_col_index])
-                    for row in data[2:] if len(row) > low_col_index and row[low_col_index].strip()
-                ]
-                historical_keywords["High"].extend(high_keywords)
-                historical_keywords["Medium"].extend(medium_keywords)
-                historical_keywords["Low"].extend(low_keywords)
-
-            except IndexError:
-                print(f"⚠️ Warning: Could not process data for column set {(i-start_col)//3 + 1}. Check column structure.")
-
-        # Remove duplicates
-        historical_keywords["High"] = list(set(historical_keywords["High"]))
-        historical_keywords["Medium"] = list(set(historical_keywords["Medium"]))
-        historical_keywords["Low"] = list(set(historical_keywords["Low"]))
+        historical_keywords = parse_keyword_tiers(rows)
+        _save_history_cache(sheet_name, days, modified, historical_keywords)
 
         return historical_keywords
 
     except Exception as e:
         print(f"❌ Error fetching historical keywords: {e}")
+        get_gateway().drop_stale(sheet_name, e)
         return {"High": [], "Medium": [], "Low": []}
 
 
-    except Exception as e:
-        print(f"❌ Error fetching historical keywords: {e}")
-        return "in the last 3 days, the keywords are not available"
-
-
 # **Agent 1: Clean and Filter Trending Topics**
-def clean_trending_topics(trending_topics, historical_keywords):
+@instrumented("agent:clean_trending_topics")
+def clean_trending_topics(trending_topics, historical_keywords, region=DEFAULT_REGION):
     """
     Filters and refines trending topics based strictly on past performance.
     """
     template = """
-    Analyze these trending Twitter (X) topics in Saudi Arabia: {trending_topics}.  
+    Analyze these trending Twitter (X) topics in {market}: {trending_topics}.  
 
     **🔹 Strict Filtering Based on Historical Performance:**  
     - **High Engagement Keywords (Prioritize & Keep)**: {high_keywords}  
@@ -181,7 +265,7 @@ def clean_trending_topics(trending_topics, historical_keywords):
 
     **✅ Focus On:**  
     - Topics **strongly linked to high-engagement words from historical data**.  
-    - Seasonal and **Saudi culturally relevant discussions**.  
+    - Seasonal and **{audience} culturally relevant discussions**.  
 
     **❌ Strictly Avoid:**  
     - Generic pan-Arabic terms unless **historically successful**.  
@@ -199,27 +283,27 @@ def clean_trending_topics(trending_topics, historical_keywords):
     - Example: "جلسة شتوية, رؤية 2030, مهرجان الرياض"
     """
 
-    prompt = ChatPromptTemplate.from_template(template)
-    chain = prompt | model
-    response = chain.invoke({
+    # Identical trends/history reuse the cached completion; topics are parsed as they stream in
+    return stream_keywords(template, get_model(), {
+        "market": region.market,
+        "audience": region.audience,
         "trending_topics": trending_topics,
         "high_keywords": ", ".join(historical_keywords["High"]),
         "medium_keywords": ", ".join(historical_keywords["Medium"]),
         "low_keywords": ", ".join(historical_keywords["Low"]),
-    }).content
-
-    return response.split(", ")  # Ensure list output
+    }, limiter=get_rate_limiter())
 
 
 
 # **Agent 2: Predict Most Frequent Words for Each Topic**
-def predict_frequent_words(cleaned_topics, current_weather, historical_keywords):
+@instrumented("agent:predict_frequent_words")
+def predict_frequent_words(cleaned_topics, current_weather, historical_keywords, region=DEFAULT_REGION):
     """
     Generates highly relevant words for trending topics using historical performance as the dominant factor.
     """
     template = """
     You must generate **EXACTLY between 45 and 50** culturally relevant Arabic keywords 
-    (MUST BE **one-word** terms) for Saudi Twitter (X). 
+    (MUST BE **one-word** terms) for {audience} Twitter (X). 
 
     **NON-NEGOTIABLE Requirements**:
     1. **All 'High' engagement keywords** must appear in **identical form** (no changes).
@@ -227,7 +311,7 @@ def predict_frequent_words(cleaned_topics, current_weather, historical_keywords)
     3. **Avoid or rework 'Low' keywords** unless there's a strong reason to keep them.
     4. **At least 80%** of your final output must be **one-word** terms 
        (e.g., "مطر" or "شتاء" not "مطر غزير").
-    6. **Use Najdi/Hijazi dialect** or comedic phrases where suitable.
+    6. **Use {dialect}** or comedic phrases where suitable.
     7. **No duplicates**. If a word is repeated in historical data, 
        only include it once in the final list.
 
@@ -238,44 +322,45 @@ def predict_frequent_words(cleaned_topics, current_weather, historical_keywords)
       "مطر, شاهي, الجامعة, برد, شتاء, اجواء, فطور, ضباب, كرك, بطانيات, ..."
 
     **Context**:
-    - Treanding Topics in KSA: {cleaned_topics}
-    - Weather Now in KSA: {current_weather}
+    - Treanding Topics in {market}: {cleaned_topics}
+    - Weather Now in {market}: {current_weather}
     - Historical Keywords that used for last 3 days:
         - High Engagement (include exactly): {high_keywords}
         - Medium Engagement (modify as needed): {medium_keywords}
         - Low Engagement (fix or remove): {low_keywords}
     """
 
-    prompt = ChatPromptTemplate.from_template(template)
-    chain = prompt | model
-
-    response = chain.invoke({
+    # A short list is topped up with only the missing words; High keywords are kept verbatim
+    return stream_keywords(template, get_model(), {
+        "market": region.market,
+        "audience": region.audience,
+        "dialect": region.dialect,
         "cleaned_topics": ", ".join(cleaned_topics),
         "current_weather": current_weather,
         "high_keywords": ", ".join(historical_keywords["High"]),
         "medium_keywords": ", ".join(historical_keywords["Medium"]),
         "low_keywords": ", ".join(historical_keywords["Low"]),
-    }).content
-
-    return response.split(", ")  # Structured list output
+    }, required=historical_keywords["High"], minimum=MIN_KEYWORDS, maximum=MAX_KEYWORDS,
+        limiter=get_rate_limiter())
 
-# **Agent 3: Localize Keywords for Saudi Arabia**
-def localize_keywords_ksa(predicted_words,high_keywords):
+# **Agent 3: Localize Keywords for the region's market**
+@instrumented("agent:localize_keywords_ksa")
+def localize_keywords_ksa(predicted_words,high_keywords, region=DEFAULT_REGION):
     """
     Localizes keywords strictly based on historical success, dialect, and humor.
     """
     template = """
-    **Transform the following words into hyper-localized Saudi terms**  
+    **Transform the following words into hyper-localized {audience} terms for {market}**  
     ensuring that **most words remain ONE WORD** unless necessary for improvement. 
-    **Use Saudi dialects, humor, and cultural relevance** to enhance the keywords.
+    **Use the {dialect}, {audience} humor, and cultural relevance** to enhance the keywords.
     **Make sure that the final list is between 45 and 50 words**.
 
     **✅ Localization Rules**  
-    - Convert **MSA to Saudi dialects** (Najdi, Hijazi).  
+    - Convert **MSA to the {dialect}**.  
     - Adapt words to **weather trends** (cold, heat, sandstorms).  
     - **Ensure at least 80% of words remain one-word terms**.  
     - **No weak past words unless fully reworked**.  
-    - **Use Saudi humor & meme culture** (if applicable).
+    - **Use {audience} humor & meme culture** (if applicable).
     - **retrun the high keywords as is**.  
 
     **🔍 Predicted Words**: {predicted_words}
@@ -287,26 +372,147 @@ def localize_keywords_ksa(predicted_words,high_keywords):
       "مطر, برد, الجامعة, شاهي, شتاء, نار, فطور, كرك, بطانيات"
     """
 
-    prompt = ChatPromptTemplate.from_template(template)
-    chain = prompt | model
-
-    response = chain.invoke({
+    return stream_keywords(template, get_model(), {
+        "market": region.market,
+        "audience": region.audience,
+        "dialect": region.dialect,
         "predicted_words": ", ".join(predicted_words)
         ,"high_keywords": ", ".join(high_keywords)
-        }
-        ).content
+        }, required=high_keywords, minimum=MIN_KEYWORDS, maximum=MAX_KEYWORDS,
+        limiter=get_rate_limiter()
+        )
 
-    return response.split(", ")  # Ensure structured output
+# Appended to the fused prompt to ask for the missing keywords only, in the same JSON format
+FUSED_TOP_UP_TEMPLATE = """
 
-# Function to update Google Sheets
-def update_google_sheet(sheet_name, keywords, column="A"):
+    **Already generated** (do NOT repeat them or return variants of them): {existing_keywords}
+
+    **Output Format** (instead of the one above): return ONLY a JSON object with {missing_count} NEW keywords
+    that follow the rules above:
+    {{"keywords": ["...", "..."]}}
+    """
+
+
+# **Fused Agent: clean, predict and localize in one structured call**
+@instrumented("agent:fused")
+def generate_keywords_fused(trending_topics, current_weather, historical_keywords, region=DEFAULT_REGION):
+    """
+    Single-call alternative to the 3-agent chain. Returns (cleaned_topics, keywords).
+    """
+    template = """
+    You are a {audience} social media keyword strategist. Do all three steps below in one pass.
+
+    **Step 1 - Filter** these trending Twitter (X) topics in {market}: {trending_topics}.
+    - Keep topics linked to high-engagement historical keywords and {audience} cultural/seasonal discussions.
+    - Drop sports, political terms, irrelevant topics and personal names (unless culture/entertainment).
+    - Rework medium/low topics into stronger variations instead of removing them when possible.
+
+    **Step 2 - Generate EXACTLY between 45 and 50** culturally relevant Arabic keywords for {audience} Twitter (X).
+    1. **All 'High' engagement keywords** must appear in **identical form** (no changes).
+    2. **Include a few 'Medium' keywords** but reworked/optimized if needed.
+    3. **Avoid or rework 'Low' keywords** unless there's a strong reason to keep them.
+    4. **At least 80%** of the keywords must be **one-word** terms.
+    5. **No duplicates**.
+
+    **Step 3 - Localize** the keywords into the {dialect}, adapted to the weather,
+    with {audience} humor where suitable. Keep the 'High' keywords exactly as given.
+
+    **Context**:
+    - Weather Now in {market}: {current_weather}
+    - High Engagement (include exactly): {high_keywords}
+    - Medium Engagement (modify as needed): {medium_keywords}
+    - Low Engagement (fix or remove): {low_keywords}
+
+    **Output Format**: return ONLY a JSON object:
+    {{"cleaned_topics": ["...", "..."], "keywords": ["...", "..."]}}
+    """
+
+    inputs = {
+        "market": region.market,
+        "audience": region.audience,
+        "dialect": region.dialect,
+        "trending_topics": ", ".join(trending_topics),
+        "current_weather": current_weather,
+        "high_keywords": ", ".join(historical_keywords["High"]),
+        "medium_keywords": ", ".join(historical_keywords["Medium"]),
+        "low_keywords": ", ".join(historical_keywords["Low"]),
+    }
+    json_model = get_model().bind(response_format={"type": "json_object"})
+    # Only a complete answer is cached, a malformed or short one is asked for again next time
+    response = cached_invoke(template, json_model, inputs, limiter=get_rate_limiter(), validate=_fused_complete)
+
+    try:
+        result = json.loads(response.strip().strip("`").removeprefix("json"))
+    except json.JSONDecodeError:
+        print("⚠️ Fused response was not valid JSON, falling back to comma splitting.")
+        result = {"keywords": response}
+    if isinstance(result, list):
+        result = {"keywords": result}
+    elif not isinstance(result, dict):
+        print(f"⚠️ Fused response was a JSON {type(result).__name__}, not an object.")
+        result = {}
+
+    # A short list is topped up with only the missing keywords, as in the chain
+    stream = KeywordStream(preferred=historical_keywords["High"], limit=MAX_KEYWORDS)
+    stream.seed(historical_keywords["High"])
+    stream.add(_keyword_items(result.get("keywords")))
+    keywords = top_up_keywords(stream, template, json_model, inputs, MIN_KEYWORDS, limiter=get_rate_limiter(),
+                               top_up_template=FUSED_TOP_UP_TEMPLATE, parse=_fused_keywords)
+
+    keywords = enforce_keyword_constraints(keywords, historical_keywords["High"])
+    return _keyword_items(result.get("cleaned_topics")), keywords
+
+
+def _fused_complete(response):
+    """Whether a fused response is a JSON object with at least MIN_KEYWORDS keywords."""
     try:
-        scope = ["https://www.googleapis.com/auth/drive"]
-        creds = ServiceAccountCredentials.from_json_keyfile_name('credentials.json', scope)
-        client = gspread.authorize(creds)
+        result = json.loads(response.strip().strip("`").removeprefix("json"))
+    except json.JSONDecodeError:
+        return False
+    return isinstance(result, dict) and len(_keyword_items(result.get("keywords"))) >= MIN_KEYWORDS
 
-        sheet = client.open(sheet_name).worksheet("Keywords")
 
+def _fused_keywords(response):
+    """The keywords of a fused top-up answer ({"keywords": [...]} or a bare list); [] if it is not JSON."""
+    try:
+        result = json.loads(response.strip().strip("`").removeprefix("json"))
+    except json.JSONDecodeError:
+        return []
+    if isinstance(result, dict):
+        result = result.get("keywords")
+    return _keyword_items(result)
+
+
+def _keyword_items(value):
+    """The string items of a JSON value that should be a keyword list; a plain string is parsed as a list."""
+    if isinstance(value, str):
+        return parse_keywords(value)
+    if isinstance(value, list):
+        return [item.strip() for item in value if isinstance(item, str) and item.strip()]
+    return []
+
+
+def enforce_keyword_constraints(keywords, high_keywords):
+    """Dedupe spelling variants, make sure every High keyword is present verbatim, and cap the list at MAX_KEYWORDS."""
+    if isinstance(keywords, str):
+        raise TypeError("keywords must be a list of keywords, not a string")
+    # High keywords go first so the cap never drops them; their variants collapse onto the exact form
+    index = KeywordIndex(preferred=high_keywords).update(high_keywords)
+    limit = max(MAX_KEYWORDS, len(index))
+    keywords = index.update(kw for kw in keywords if isinstance(kw, str)).keywords()[:limit]
+
+    one_word = sum(1 for kw in keywords if len(kw.split()) == 1)
+    if len(keywords) < MIN_KEYWORDS:
+        print(f"⚠️ Only {len(keywords)} keywords returned (expected {MIN_KEYWORDS}-{MAX_KEYWORDS}).")
+    if keywords and one_word / len(keywords) < 0.8:
+        print(f"⚠️ Only {one_word}/{len(keywords)} keywords are one-word terms.")
+    return keywords
+
+
+# Function to update Google Sheets
+@instrumented("sheet_write")
+def update_google_sheet(sheet_name, keywords, column="A"):
+    try:
         # Ensure keywords are formatted correctly
         if not isinstance(keywords, list):
             keywords_list = [keyword.strip() for keyword in keywords.split(',') if keyword.strip()]
@@ -314,44 +520,160 @@ def update_google_sheet(sheet_name, keywords, column="A"):
         else:
             update_data = [[kw] if isinstance(kw, str) else kw for kw in keywords]  # Ensure each entry is a list
 
-        if update_data:  # Ensure we have data to update
-            range_str = f"{column}2:{column}{len(update_data) + 1}"
-            sheet.update(range_str, update_data)
+        # Keywords from row 2 down; leftovers from a longer previous list are cleared
+        col_index = cell_key(f"{column}1")[1]
+        keyword_update = SheetUpdate("Keywords", grid_cells(update_data, start_row=2, start_col=col_index),
+                                     region=(2, col_index, col_index))
 
-        # Add timestamp in column C
+        # Add timestamp in column C (only sent when the keywords actually changed)
         time_now = time.strftime("%Y-%m-%d %H:%M:%S")
         cell_time_formatted = f"✅Last Updated: {time_now}"
-        sheet.update_cell(2, 3, cell_time_formatted)
+        timestamp_update = SheetUpdate("Keywords", {(2, 3): cell_time_formatted})
 
-        print(f"Google Sheet updated successfully in column {column}.")
+        # One batched request with only the changed cells
+        if get_sheet_writer().write(sheet_name, [keyword_update], with_changes=[timestamp_update]):
+            print(f"Google Sheet updated successfully in column {column}.")
+        return True
 
     except Exception as e:
         print(f"Error updating Google Sheets: {e}")
+        get_gateway().drop_stale(sheet_name, e)
+        return False
+
+
+# Ingestion stage: the three independent sources run concurrently, each fetched once;
+# dry runs and replays (archive=False) leave the trend archive untouched
+def ingest_sources(region=DEFAULT_REGION, archive=True):
+    results = run_sources([
+        Source("trends", lambda: scrape_saudi_trends(region.trends_url), TRENDS_TIMEOUT, []),
+        Source("history", lambda: get_historical_keywords(region.history_sheet, days=HISTORY_DAYS),
+               HISTORY_TIMEOUT, {"High": [], "Medium": [], "Low": []}),
+        Source("weather", lambda: (get_weather_data(region.weather_location) or {}).get("description"),
+               WEATHER_TIMEOUT, DEFAULT_WEATHER),
+    ])
+
+    # Keep every scraped ranking for the velocity analytics
+    if archive:
+        try:
+            get_trend_archive().append(region.name, results["trends"])
+        except OSError as e:
+            print(f"⚠️ Could not archive trends: {e}")
+    return results["trends"], results["history"], results["weather"]
+
+
+# Function to pre-rank a region's trends with fast risers boosted; the velocities are read from the
+# archive here, inside the checkpointed stage, so a resumed or replayed cycle reuses the saved ranking
+def rank_region_trends(region, trends, historical_keywords):
+    archive = get_trend_archive()
+    momentum = archive.velocities(region.name)
+    risers = archive.risers(region.name, limit=5)
+    print(f"📈 [{region.name}] Top risers ({VELOCITY_WINDOW_HOURS}h):",
+          ", ".join(f"{stat.name} (+{stat.velocity}/h)" for stat in risers) or "none")
+    return rank_trends(trends, historical_keywords, momentum)
+
+
+# One full pipeline cycle for a region: ingest -> 3 agents (or the fused call) -> sheet write.
+# Every stage's output is checkpointed, so a failed cycle resumes from the stage that failed;
+# with write=False (replays, dry runs) the change detector, the trend archive and the sheet write are skipped.
+def run_ksa_cycle(region=DEFAULT_REGION, checkpoint=None, write=True):
+    checkpoint = checkpoint or open_checkpoint(region.name)
+    saudi_trends, historical_keywords, weather_description = checkpoint.stage(
+        "ingest", region, lambda: ingest_sources(region, archive=write))
+    print(f"[{region.name}] Historical Keywords high:", historical_keywords["High"])
+
+    # Skip the LLM stages when the trends barely moved and nothing else changed
+    detector = get_change_detector()
+    inputs_fingerprint = fingerprint(historical_keywords, weather_description, PIPELINE_MODE)
+    if write and not detector.should_run(region.name, saudi_trends, inputs_fingerprint):
+        checkpoint.complete()
+        return None
+
+    # Only the most relevant, non-blocklisted trends are sent to the model
+    candidate_trends = checkpoint.stage(
+        "rank_trends", (saudi_trends, historical_keywords),
+        lambda: rank_region_trends(region, saudi_trends, historical_keywords))
+
+    if PIPELINE_MODE == "fused":
+        cleaned_topics, localized_keywords = checkpoint.stage(
+            "fused", (candidate_trends, weather_description, historical_keywords, region),
+            lambda: generate_keywords_fused(candidate_trends, weather_description, historical_keywords, region))
+    else:
+        cleaned_topics = checkpoint.stage(
+            "clean_trending_topics", (candidate_trends, historical_keywords, region),
+            lambda: clean_trending_topics(candidate_trends, historical_keywords, region))
+        predicted_words = checkpoint.stage(
+            "predict_frequent_words", (cleaned_topics, weather_description, historical_keywords, region),
+            lambda: predict_frequent_words(cleaned_topics, weather_description, historical_keywords, region))
+        localized_keywords = checkpoint.stage(
+            "localize_keywords_ksa", (predicted_words, historical_keywords["High"], region),
+            lambda: localize_keywords_ksa(predicted_words,historical_keywords["High"], region))
+
+    # Remove duplicates (including spelling variants) and keep the High keywords verbatim
+    localized_keywords = enforce_keyword_constraints(localized_keywords, historical_keywords["High"])
+    if not write:
+        checkpoint.complete()
+        return localized_keywords
+
+    # Update Google Sheet
+    if not update_google_sheet(region.target_sheet, localized_keywords):
+        raise RuntimeError(f"Sheet update for '{region.name}' failed (cycle {checkpoint.cycle_id} can be resumed)")
+    detector.commit(region.name, saudi_trends, inputs_fingerprint)
+    checkpoint.complete()
+    # update_google_sheet("Trending Keywords Saudi", cleaned_topics, column="B")
+    # update_google_sheet("Trending Keywords Saudi", saudi_trends, column="D")
+    return localized_keywords
+
+
+# Function to run one region's cycle with its own metrics (exported as metrics/<region>.jsonl);
+# a failed cycle is retried from its checkpoint, so only the failed stage is paid for again
+def run_region_cycle(region):
+    for attempt in range(KSA_CYCLE_RETRIES + 1):
+        try:
+            with metrics.cycle(region.name):
+                return run_ksa_cycle(region)
+        except Exception as e:
+            if attempt == KSA_CYCLE_RETRIES:
+                raise
+            print(f"⚠️ [{region.name}] Cycle failed ({e}), resuming in {KSA_RETRY_DELAY}s "
+                  f"(attempt {attempt + 1}/{KSA_CYCLE_RETRIES}).")
+            time.sleep(KSA_RETRY_DELAY)
 
 
-# **Main Execution**
-if __name__ == "__main__":
-    while True:
-        start_time = time.time()
+# Function to re-run a saved cycle's stages from `from_stage` on, offline (nothing is written to the sheet)
+def replay_cycle(cycle_id, from_stage, region=DEFAULT_REGION):
+    checkpoint = load_checkpoint(region.name, cycle_id, fresh_from=from_stage)
+    if from_stage not in checkpoint.stages:
+        raise ValueError(f"Cycle {cycle_id} has no '{from_stage}' stage (saved: {', '.join(checkpoint.stages)})")
+    checkpoint.cycle_id = f"{cycle_id}-replay-{int(time.time())}"  # keep the original cycle untouched
+    with metrics.cycle(f"{region.name}-replay"):
+        return run_ksa_cycle(region, checkpoint, write=False)
 
-        saudi_trends = scrape_saudi_trends()
-        historical_keywords = get_historical_keywords("Target", days=1)
-        print("Historical Keywords high:", historical_keywords["High"])
 
-        cleaned_topics = clean_trending_topics(saudi_trends, historical_keywords)
-        weather_description = get_weather_data()["description"] if get_weather_data() else "الطقس معتدل"
+# Function to run a region's cycle without writing to the sheet (its checkpoints are kept apart from real cycles)
+def dry_run_cycle(region=DEFAULT_REGION):
+    with metrics.cycle(f"{region.name}-dry-run"):
+        return run_ksa_cycle(region, open_checkpoint(f"{region.name}-dry-run", resume=False), write=False)
 
-        predicted_words = predict_frequent_words(cleaned_topics, weather_description, historical_keywords)
-        localized_keywords = localize_keywords_ksa(predicted_words,historical_keywords["High"])
 
-        # Remove duplicates
-        localized_keywords = list(set(localized_keywords))
+# Function to run one timed cycle over all configured regions (the unit the scheduler runs)
+def run_ksa_job(regions=None):
+    regions = regions or get_regions(KSA_REGIONS)
+    gateway = get_gateway()
+    start_time = time.time()
+    api_calls_before = gateway.total_api_calls()
 
-        # Update Google Sheet
-        update_google_sheet("Trending Keywords Saudi Based on Input", localized_keywords)
-        # update_google_sheet("Trending Keywords Saudi", cleaned_topics, column="B")
-        # update_google_sheet("Trending Keywords Saudi", saudi_trends, column="D")
+    # Regions run concurrently and share the HTTP session, driver pool and LLM rate limiter
+    run_regions(regions, run_region_cycle)
 
-        print(f"\n✅ Time taken: {(time.time() - start_time) / 60:.2f} minutes")
-        print("⏳ Script will run again in 1 hour...\n")
-        time.sleep(18000)
+    print(f"\n✅ Time taken for {len(regions)} region(s): {(time.time() - start_time) / 60:.2f} minutes")
+    print(f"📊 Google Sheets API calls this cycle: {gateway.total_api_calls() - api_calls_before}")
+    print(f"📊 LLM cache: {get_llm_cache().stats()}")
+
+
+# **Main Execution**
+if __name__ == "__main__":
+    check_config()
+    while True:
+        run_ksa_job()
+        print(f"⏳ Script will run again in {KSA_INTERVAL_SECONDS / 3600:g} hour(s)...\n")
+        time.sleep(KSA_INTERVAL_SECONDS)
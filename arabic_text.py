@@ -0,0 +1,81 @@
+import re
+
+# Harakat, Quranic annotation marks and dagger alef
+_DIACRITICS = [chr(code) for code in range(0x064B, 0x0660)] + ["\u0670"]
+# Tatweel, Arabic letter mark, zero-width and bidi control characters
+_INVISIBLE = ["\u0640", "\u061C", "\uFEFF"] + [chr(code) for code in range(0x200B, 0x2010)] + \
+             [chr(code) for code in range(0x2066, 0x206A)]
+
+# Spelling variants folded to one letter when comparing keywords
+_FOLDED = {
+    "\u0623": "\u0627", "\u0625": "\u0627", "\u0622": "\u0627", "\u0671": "\u0627",  # أ إ آ ٱ -> ا
+    "\u0649": "\u064A", "\u0626": "\u064A", "\u06CC": "\u064A",  # ى ئ ی -> ي
+    "\u0624": "\u0648",  # ؤ -> و
+    "\u0629": "\u0647",  # ة -> ه
+    "\u06A9": "\u0643",  # ک -> ك
+}
+_DIGITS = {chr(0x0660 + digit): str(digit) for digit in range(10)}  # Arabic-Indic digits
+
+# Display form: only drop invisible/decorative characters
+DISPLAY_TABLE = str.maketrans(dict.fromkeys(_INVISIBLE))
+# Canonical form: also drop diacritics and fold letter variants and digits
+CANONICAL_TABLE = str.maketrans({**dict.fromkeys(_DIACRITICS + _INVISIBLE), **_FOLDED, **_DIGITS})
+
+WHITESPACE_RE = re.compile(r"\s+")
+
+
+def display_form(text):
+    """The keyword as it should be shown: trimmed, single-spaced, without tatweel or invisible marks."""
+    return WHITESPACE_RE.sub(" ", text.translate(DISPLAY_TABLE)).strip()
+
+
+def canonical(text):
+    """Comparison key: variants that differ only by hamza/alef forms, ta marbuta, diacritics,
+    tatweel, digits or whitespace share one canonical form."""
+    return WHITESPACE_RE.sub(" ", text.translate(CANONICAL_TABLE)).strip().casefold()
+
+
+class KeywordIndex:
+    """Ordered canonical-form -> display-form index.
+
+    Each keyword is kept once, in first-seen order, under its canonical form.
+    `preferred` forms (e.g. the High keywords, which must appear verbatim) win
+    over whatever variant is added; otherwise the first variant seen is shown.
+    """
+
+    def __init__(self, preferred=()):
+        self._preferred = {}
+        for keyword in preferred:
+            self._preferred.setdefault(canonical(keyword), keyword)
+        self._forms = {}
+
+    def add(self, keyword):
+        """Add one keyword; returns False if it was empty or a variant of one already indexed."""
+        key = canonical(keyword)
+        if not key or key in self._forms:
+            return False
+        self._forms[key] = self._preferred.get(key) or display_form(keyword)
+        return True
+
+    def update(self, keywords):
+        for keyword in keywords:
+            self.add(keyword)
+        return self
+
+    def __contains__(self, keyword):
+        return canonical(keyword) in self._forms
+
+    def __len__(self):
+        return len(self._forms)
+
+    def display(self, keyword):
+        """Display form stored for `keyword`'s canonical form, or None."""
+        return self._forms.get(canonical(keyword))
+
+    def keywords(self):
+        return list(self._forms.values())
+
+
+def dedupe_keywords(keywords, preferred=()):
+    """Keywords without spelling-variant duplicates, in first-seen order, preferred forms verbatim."""
+    return KeywordIndex(preferred).update(keywords).keywords()
@@ -0,0 +1,66 @@
+"""Benchmark the trend archive: a year of hourly snapshots, then the velocity queries.
+
+Usage: python -m bench.bench_archive --days 365 --regions 11 --trends 50
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from trend_archive import TrendArchive
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--regions", type=int, default=11)
+    parser.add_argument("--trends", type=int, default=50, help="trends per snapshot")
+    parser.add_argument("--pool", type=int, default=5000, help="distinct trend names")
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    random.seed(0)
+    names = [f"ترند {i}" for i in range(args.pool)]
+    regions = [f"region{i}" for i in range(args.regions)]
+    now = int(time.time())
+    start_ts = now - args.days * 86400
+
+    with tempfile.TemporaryDirectory() as directory:
+        archive = TrendArchive(directory)
+        start = time.perf_counter()
+        current = {region: random.sample(names, args.trends) for region in regions}
+        for hour in range(args.days * 24):
+            for region in regions:
+                trends = current[region]
+                # Drift: a few trends leave, a few arrive, neighbours swap
+                for _ in range(3):
+                    trends[random.randrange(len(trends))] = random.choice(names)
+                i = random.randrange(len(trends) - 1)
+                trends[i], trends[i + 1] = trends[i + 1], trends[i]
+                archive.append(region, trends, timestamp=start_ts + hour * 3600)
+        build = time.perf_counter() - start
+        rows = len(archive.rows())
+        size = os.path.getsize(archive.rows_path) + os.path.getsize(archive.strings_path)
+        print(f"{rows:,} rows ({args.days} days x {args.regions} regions x {args.trends} trends hourly) "
+              f"in {size / 1e6:.1f} MB, built in {build:.1f}s")
+
+        for label, query in [
+            ("risers(24h)", lambda: archive.risers(regions[0], hours=24, now=now)),
+            ("fallers(24h)", lambda: archive.fallers(regions[0], hours=24, now=now)),
+            ("velocities(24h)", lambda: archive.velocities(regions[0], hours=24, now=now)),
+            ("risers(7d)", lambda: archive.risers(regions[0], hours=24 * 7, now=now)),
+        ]:
+            samples = []
+            for _ in range(args.runs):
+                start = time.perf_counter()
+                result = query()
+                samples.append(time.perf_counter() - start)
+            print(f"{label:<16} p50={statistics.median(samples) * 1000:8.2f}ms  max={max(samples) * 1000:8.2f}ms  "
+                  f"({len(result)} results)")
+        print("top risers:", archive.risers(regions[0], hours=24, limit=3, now=now))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""Offline end-to-end benchmark for both pipelines.
+
+Everything external is replaced by a local stand-in: a fixture HTTP server for
+getdaytrends and the weather API, an in-memory gspread client, and the
+deterministic fake chat model. Each pipeline runs at several sizes and the
+report shows per-stage p50/p95 latency and Sheets API calls per run.
+
+Usage:
+    python -m bench.bench_e2e --runs 5 --trends 50,200 --history-days 3,30 --queries 20,200
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from collections import defaultdict
+
+import KeyWordsBasedOnInput as kbi
+import KeyWordsKSA as ksa
+import change_detector
+import checkpoints
+import query_runner
+import sheets_gateway
+import trend_archive
+from bench.fakes import FakeChatModel, FakeGspreadClient, pipeline_responder
+from bench.fixture_server import render_trends_page, serve_fixtures, weather_payload
+from llm_cache import get_llm_cache
+from query_runner import RateLimiter
+from sheet_watcher import InputSheetWatcher
+
+KSA_STAGES = ["scrape_saudi_trends", "get_historical_keywords", "get_weather_data", "rank_trends",
+              "clean_trending_topics", "predict_frequent_words", "localize_keywords_ksa", "generate_keywords_fused",
+              "update_google_sheet"]
+INPUT_STAGES = ["scrape_saudi_trends", "generate_query_keywords", "update_google_sheet"]
+
+
+class StageTimer:
+    """Wraps module-level functions so every call records its duration and Sheets API calls."""
+
+    def __init__(self, client):
+        self.client = client
+        self.durations = defaultdict(list)
+        self.api_calls = defaultdict(list)
+
+    def wrap(self, module, names):
+        for name in names:
+            setattr(module, name, self._timed(name, getattr(module, name)))
+
+    def _timed(self, name, function):
+        def timed(*args, **kwargs):
+            calls_before = self.client.total_api_calls()
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.durations[name].append(time.perf_counter() - start)
+                self.api_calls[name].append(self.client.total_api_calls() - calls_before)
+        return timed
+
+    def record(self, name, seconds, api_calls):
+        self.durations[name].append(seconds)
+        self.api_calls[name].append(api_calls)
+
+
+def percentile(samples, fraction):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+def report(title, timer, runs):
+    print(f"\n== {title}")
+    print(f"{'stage':<26}{'calls/run':>10}{'p50 ms':>11}{'p95 ms':>11}{'sheets api/run':>16}")
+    for name, samples in timer.durations.items():
+        print(f"{name:<26}{len(samples) / runs:>10.1f}{statistics.median(samples) * 1000:>11.1f}"
+              f"{percentile(samples, 0.95) * 1000:>11.1f}{sum(timer.api_calls[name]) / runs:>16.1f}")
+
+
+def history_rows(days, per_tier=15):
+    header = [""] * (days * 3)
+    tiers = []
+    for _ in range(days):
+        tiers += ["High", "Medium", "Low"]
+    rows = [header, tiers]
+    for rank in range(1, per_tier + 1):
+        rows.append([f"{rank} - {tier}{rank}_{col // 3}" for col, tier in enumerate(tiers)])
+    return rows
+
+
+def bench_ksa(base_url, trends, days, runs, args, workdir):
+    client = FakeGspreadClient({
+        ksa.HISTORY_SHEET_NAME: {"Keyword rate": history_rows(days)},
+        ksa.TARGET_SHEET_NAME: {"Keywords": []},
+    }, latency=args.sheet_latency)
+    sheets_gateway._gateway = sheets_gateway.SheetsGateway(client=client)
+
+    region = ksa.DEFAULT_REGION._replace(trends_url=f"{base_url}/trends/{trends}/")
+    ksa.API_URL = f"{base_url}/weather"
+    ksa.FILE_PATH = os.path.join(workdir, "weather_data_{location}.txt")
+    ksa.HISTORY_CACHE_PATH = os.path.join(workdir, "historical_keywords_cache.json")
+    ksa.HISTORY_DAYS = days
+    ksa.PIPELINE_MODE = args.mode
+    ksa.model = FakeChatModel(latency=args.llm_latency, responder=pipeline_responder)
+
+    timer = StageTimer(client)
+    originals = {name: getattr(ksa, name) for name in KSA_STAGES}
+    timer.wrap(ksa, KSA_STAGES)
+    try:
+        for _ in range(runs):
+            weather_file = ksa.FILE_PATH.format(location=region.weather_location)
+            for path in (weather_file, ksa.HISTORY_CACHE_PATH):  # measure the fetches, not the local caches
+                if os.path.exists(path):
+                    os.remove(path)
+            calls_before = client.total_api_calls()
+            start = time.perf_counter()
+            ksa.run_ksa_cycle(region)
+            timer.record("TOTAL cycle", time.perf_counter() - start, client.total_api_calls() - calls_before)
+    finally:
+        for name, function in originals.items():
+            setattr(ksa, name, function)
+    report(f"KeyWordsKSA  mode={args.mode} trends={trends} history_days={days}", timer, runs)
+
+
+def bench_input(base_url, trends, queries, runs, args):
+    sheet_name = "Bench Input"
+    input_rows = [["Query"], ["query 0", "", "", "Ready"]] + [[f"query {i}"] for i in range(1, queries)]
+    client = FakeGspreadClient({sheet_name: {"INPUT": input_rows, "OUTPUT": []}}, latency=args.sheet_latency)
+    gateway = sheets_gateway.SheetsGateway(client=client)
+
+    kbi.TRENDS_URL = f"{base_url}/trends/{trends}/"
+    kbi.model = FakeChatModel(latency=args.llm_latency)
+    kbi.EXECUTION_MODE = args.input_mode
+
+    timer = StageTimer(client)
+    originals = {name: getattr(kbi, name) for name in INPUT_STAGES}
+    timer.wrap(kbi, INPUT_STAGES)
+    try:
+        for _ in range(runs):
+            calls_before = client.total_api_calls()
+            start = time.perf_counter()
+            _, polled_queries = InputSheetWatcher(sheet_name, gateway).poll()
+            timer.record("watcher poll", time.perf_counter() - start, client.total_api_calls() - calls_before)
+            kbi.run_input_job(sheet_name, polled_queries, gateway)
+            timer.record("TOTAL job", time.perf_counter() - start, client.total_api_calls() - calls_before)
+    finally:
+        for name, function in originals.items():
+            setattr(kbi, name, function)
+    report(f"KeyWordsBasedOnInput  mode={args.input_mode} trends={trends} queries={queries}", timer, runs)
+
+
+def sizes(value):
+    return [int(item) for item in value.split(",") if item]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--trends", type=sizes, default=[50, 200])
+    parser.add_argument("--history-days", type=sizes, default=[3, 30])
+    parser.add_argument("--queries", type=sizes, default=[20, 200])
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="fake model seconds per call")
+    parser.add_argument("--sheet-latency", type=float, default=0.01, help="fake Sheets seconds per API call")
+    parser.add_argument("--http-latency", type=float, default=0.0, help="fixture server seconds per request")
+    parser.add_argument("--mode", default=ksa.PIPELINE_MODE, help="KSA pipeline mode")
+    parser.add_argument("--input-mode", default=kbi.EXECUTION_MODE, help="input query execution mode")
+    parser.add_argument("--only", choices=["ksa", "input"])
+    args = parser.parse_args()
+
+    get_llm_cache().bypass = True  # every run pays for its model calls
+    query_runner._limiter = RateLimiter()  # the fake model has no rate limit
+
+    routes = {"/weather": ("application/json", weather_payload())}
+    for count in args.trends:
+        routes[f"/trends/{count}/"] = ("text/html; charset=utf-8", render_trends_page(count))
+
+    with serve_fixtures(routes, latency=args.http_latency) as base_url, tempfile.TemporaryDirectory() as workdir:
+        checkpoints.CHECKPOINT_DIR = os.path.join(workdir, "checkpoints")
+        # Same fixture every run: never skip a run as "unchanged"
+        change_detector._detector = change_detector.ChangeDetector(
+            path=os.path.join(workdir, "change_snapshots.json"), threshold=0.0)
+        trend_archive._archive = trend_archive.TrendArchive(os.path.join(workdir, "trend_archive"))
+        if args.only != "input":
+            for trends in args.trends:
+                for days in args.history_days:
+                    bench_ksa(base_url, trends, days, args.runs, args, workdir)
+        if args.only != "ksa":
+            for trends in args.trends:
+                for queries in args.queries:
+                    bench_input(base_url, trends, queries, args.runs, args)
+
+
+if __name__ == "__main__":
+    main()
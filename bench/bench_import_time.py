@@ -0,0 +1,61 @@
+"""Benchmark cold-start time: each command runs in a fresh interpreter.
+
+"heavy deps" imports what the job modules used to load at import time, so it is
+the cost every command paid before they became lazy. The last column lists the
+heavy packages each command actually loaded.
+
+Usage: python -m bench.bench_import_time --runs 10
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+HEAVY_MODULES = ["selenium", "webdriver_manager", "langchain_core", "langchain_openai", "openai",
+                 "gspread", "oauth2client", "httpx", "numpy", "requests"]
+
+COMMANDS = {
+    "python": "pass",
+    "cli --help": "import sys, cli; sys.argv = ['cli.py', '--help']\ntry: cli.main()\nexcept SystemExit: pass",
+    "import KeyWordsKSA": "import KeyWordsKSA",
+    "import KeyWordsBasedOnInput": "import KeyWordsBasedOnInput",
+    "heavy deps": "import selenium.webdriver, webdriver_manager.chrome, langchain_openai, gspread, "
+                  "oauth2client.service_account, httpx",
+}
+
+# Appended to every command: report which heavy packages ended up imported
+REPORT = "\nimport sys as _sys\nprint(','.join(m for m in {modules!r} if m in _sys.modules), file=_sys.stderr)"
+
+
+def run(code):
+    """Seconds for one fresh interpreter to run `code`, and the heavy packages it loaded (or the error)."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    start = time.perf_counter()
+    process = subprocess.run([sys.executable, "-c", code + REPORT.format(modules=HEAVY_MODULES)],
+                             cwd=root, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    lines = process.stderr.strip().splitlines()
+    if process.returncode != 0:
+        return elapsed, f"failed: {lines[-1] if lines else process.returncode}"
+    return elapsed, lines[-1] if lines else ""
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    for label, code in COMMANDS.items():
+        run(code)  # warm the OS file cache and __pycache__
+        samples, loaded = [], ""
+        for _ in range(args.runs):
+            elapsed, loaded = run(code)
+            samples.append(elapsed)
+        print(f"{label:<28} p50={statistics.median(samples) * 1000:8.1f}ms  "
+              f"max={max(samples) * 1000:8.1f}ms  loaded: {loaded or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Compare the 3-agent chain with the fused single-call mode against a fake model.
+
+Usage: python -m bench.bench_pipeline_modes --latency 2.0 --trends 50 --history 30
+"""
+import argparse
+import time
+
+import KeyWordsKSA as ksa
+from bench.fakes import FakeChatModel, pipeline_responder
+from llm_cache import get_llm_cache
+
+
+def describe(keywords, high_keywords):
+    one_word = sum(1 for kw in keywords if len(kw.split()) == 1)
+    return (f"{len(keywords)} keywords, {len(set(keywords))} unique, "
+            f"{sum(1 for kw in high_keywords if kw in keywords)}/{len(high_keywords)} High verbatim, "
+            f"{one_word}/{len(keywords) or 1} one-word")
+
+
+def run_mode(mode, trends, weather, history, latency):
+    ksa.model = FakeChatModel(latency=latency, responder=pipeline_responder)
+    start = time.perf_counter()
+    if mode == "fused":
+        _, keywords = ksa.generate_keywords_fused(trends, weather, history)
+    else:
+        cleaned = ksa.clean_trending_topics(trends, history)
+        predicted = ksa.predict_frequent_words(cleaned, weather, history)
+        keywords = ksa.localize_keywords_ksa(predicted, history["High"])
+    elapsed = time.perf_counter() - start
+    model = ksa.model
+    print(f"{mode:<6} {elapsed:6.2f}s  calls={model.calls}  prompt_tokens={model.prompt_tokens}  "
+          f"completion_tokens={model.completion_tokens}  | {describe(keywords, history['High'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.5, help="fake model seconds per call")
+    parser.add_argument("--trends", type=int, default=50)
+    parser.add_argument("--history", type=int, default=30, help="keywords per tier")
+    args = parser.parse_args()
+
+    get_llm_cache().bypass = True
+    trends = [f"ترند {i}" for i in range(args.trends)]
+    history = {tier: [f"{tier}{i}" for i in range(args.history)] for tier in ("High", "Medium", "Low")}
+    history["High"] = history["High"][:10]
+
+    for mode in ("chain", "fused"):
+        run_mode(mode, trends, "مشمس", history, args.latency)
+
+
+if __name__ == "__main__":
+    main()
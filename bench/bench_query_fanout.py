@@ -0,0 +1,59 @@
+"""Compare sequential, concurrent and batched query execution against a fake chat model.
+
+Usage: python -m bench.bench_query_fanout --queries 200 --latency 0.5 --concurrency 16
+"""
+import argparse
+import time
+
+import KeyWordsBasedOnInput as kbi
+from bench.fakes import FakeChatModel
+from llm_cache import get_llm_cache
+from query_runner import RateLimiter
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--rate-limit-every", type=int, default=0,
+                        help="inject a 429 every N calls in every mode (0 = never); sequential mode doesn't retry")
+    parser.add_argument("--skip-sequential", action="store_true")
+    args = parser.parse_args()
+
+    trending_topics = ", ".join(f"ترند {i}" for i in range(50))
+    queries = [f"query {i}" for i in range(args.queries)]
+    kbi.QUERY_MAX_RETRIES = 5
+    get_llm_cache().bypass = True  # measure model calls, not cache hits
+
+    if not args.skip_sequential:
+        model = FakeChatModel(latency=args.latency, rate_limit_every=args.rate_limit_every)
+        start = time.perf_counter()
+        sequential = kbi.generate_query_keywords(trending_topics, queries, model, mode="sequential")
+        print(f"sequential: {time.perf_counter() - start:.2f}s, {len(sequential)} queries, {model.calls} calls, "
+              f"{model.errors} injected 429s")
+
+    model = FakeChatModel(latency=args.latency, rate_limit_every=args.rate_limit_every)
+    limiter = RateLimiter(requests_per_minute=100000, tokens_per_minute=None)
+    start = time.perf_counter()
+    concurrent = kbi.generate_query_keywords(
+        trending_topics, queries, model, mode="async", concurrency=args.concurrency, limiter=limiter,
+    )
+    elapsed = time.perf_counter() - start
+    in_order = list(concurrent) == [q for q in queries if q in concurrent]
+    print(f"async x{args.concurrency}: {elapsed:.2f}s, {len(concurrent)} queries, "
+          f"{model.calls} calls, {model.errors} injected 429s, order preserved: {in_order}, "
+          f"tokens: {model.prompt_tokens} prompt / {model.completion_tokens} completion")
+
+    model = FakeChatModel(latency=args.latency, rate_limit_every=args.rate_limit_every)
+    start = time.perf_counter()
+    batched = kbi.generate_query_keywords(
+        trending_topics, queries, model, mode="batched", concurrency=args.concurrency, limiter=limiter,
+    )
+    print(f"batched x{args.concurrency}: {time.perf_counter() - start:.2f}s, {len(batched)} queries, "
+          f"{model.calls} calls, {model.errors} injected 429s, "
+          f"tokens: {model.prompt_tokens} prompt / {model.completion_tokens} completion")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""Benchmark the local trend pre-ranker on synthetic trends and history.
+
+Usage: python -m bench.bench_ranker --trends 50,200,500 --history 30 --top-k 30
+"""
+import argparse
+import statistics
+import time
+
+from trend_ranker import TrendRanker
+
+
+def sizes(value):
+    return [int(size) for size in value.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--trends", type=sizes, default=[50, 200, 500])
+    parser.add_argument("--history", type=int, default=30, help="keywords per tier")
+    parser.add_argument("--top-k", type=int, default=30)
+    args = parser.parse_args()
+
+    history = {tier: [f"{word} {tier}{i}" for i, word in enumerate(["مطر", "شتاء", "كرك", "برد"] * args.history)]
+               [:args.history] for tier in ("High", "Medium", "Low")}
+    ranker = TrendRanker(top_k=args.top_k)
+    for count in args.trends:
+        trends = [f"#ترند_{i} الرياض\n{i}K Tweets" for i in range(count)]
+        samples = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            kept, blocked = ranker.rank(trends, history)
+            samples.append(time.perf_counter() - start)
+        print(f"{count:>5} trends -> {len(kept):>3} kept  p50={statistics.median(samples) * 1000:7.2f}ms  "
+              f"max={max(samples) * 1000:7.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
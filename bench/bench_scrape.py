@@ -0,0 +1,58 @@
+"""Benchmark the HTTP fast path against the Selenium path, fully offline.
+
+Usage: python -m bench.bench_scrape --runs 20 [--selenium]
+"""
+import argparse
+import statistics
+import time
+
+from bench.fixture_server import load_fixture, serve_fixtures
+from trends_fetcher import fetch_trends, parse_trends
+
+
+def _report(label, samples):
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    print(f"{label:<28} p50={statistics.median(samples) * 1000:8.2f}ms  p95={p95 * 1000:8.2f}ms  n={len(samples)}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--selenium", action="store_true", help="also time the headless Chrome path")
+    args = parser.parse_args()
+
+    html = load_fixture().decode("utf-8")
+    parse_samples = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        trends = parse_trends(html)
+        parse_samples.append(time.perf_counter() - start)
+    print(f"fixture: {len(html)} chars, {len(trends)} td.main cells")
+    _report("parse (html.parser)", parse_samples)
+
+    with serve_fixtures() as base_url:
+        url = f"{base_url}/saudi-arabia/"
+
+        http_samples = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            fetched = fetch_trends(url)
+            http_samples.append(time.perf_counter() - start)
+        assert fetched == trends, "HTTP path returned different cells than the parser"
+        _report("end-to-end (pooled HTTP)", http_samples)
+
+        if args.selenium:
+            from KeyWordsKSA import scrape_saudi_trends_selenium
+
+            selenium_samples = []
+            for _ in range(max(1, args.runs // 5)):
+                start = time.perf_counter()
+                scraped = scrape_saudi_trends_selenium(url)
+                selenium_samples.append(time.perf_counter() - start)
+            print(f"selenium cells match: {scraped == trends}")
+            _report("end-to-end (Selenium)", selenium_samples)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+"""Local stand-ins used by the benchmarks (no network, no credentials)."""
+import asyncio
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+
+from query_runner import estimate_tokens
+
+
+class FakeRateLimitError(Exception):
+    """Mimics openai.RateLimitError closely enough for the retry logic."""
+    status_code = 429
+
+
+def fake_keywords(prompt, count=30):
+    """Deterministic list of `count` pseudo-keywords derived from the prompt text."""
+    digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest() * (count // 30 + 1)
+    return [f"كلمة{digest[i:i + 4]}" for i in range(0, count * 2, 2)]
+
+
+BATCH_ID_RE = re.compile(r"^\s*(q\d+): (.+)$", re.MULTILINE)
+
+
+def default_responder(prompt):
+    """Deterministic keywords: a JSON id -> list map for batched prompts, a comma list otherwise."""
+    batch = BATCH_ID_RE.findall(prompt)
+    if batch:
+        return json.dumps({query_id: fake_keywords(query) for query_id, query in batch}, ensure_ascii=False)
+    return ", ".join(fake_keywords(prompt))
+
+
+def pipeline_responder(prompt):
+    """Answers like the KSA agents: JSON for the fused prompt, a 48-item comma list otherwise."""
+    keywords = fake_keywords(prompt, 48)
+    if "JSON" in prompt:
+        return json.dumps({"cleaned_topics": keywords[:10], "keywords": keywords}, ensure_ascii=False)
+    return ", ".join(keywords)
+
+
+class FakeChatModel(BaseChatModel):
+    """Deterministic chat model with configurable latency and injected rate-limit errors.
+
+    latency: seconds slept per call.
+    rate_limit_every: every Nth call raises FakeRateLimitError (0 disables).
+    responder: callable(prompt_text) -> completion text.
+    """
+
+    model_name: str = "fake-gpt-4o"
+    temperature: float = 0.0
+    latency: float = 0.0
+    rate_limit_every: int = 0
+    responder: Optional[Callable[[str], str]] = None
+
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+    _calls: int = PrivateAttr(default=0)
+    _errors: int = PrivateAttr(default=0)
+    _prompt_tokens: int = PrivateAttr(default=0)
+    _completion_tokens: int = PrivateAttr(default=0)
+
+    @property
+    def _llm_type(self):
+        return "fake-chat"
+
+    @property
+    def calls(self):
+        return self._calls
+
+    @property
+    def errors(self):
+        return self._errors
+
+    @property
+    def prompt_tokens(self):
+        return self._prompt_tokens
+
+    @property
+    def completion_tokens(self):
+        return self._completion_tokens
+
+    def _next_call(self):
+        with self._lock:
+            self._calls += 1
+            fail = self.rate_limit_every and self._calls % self.rate_limit_every == 0
+            if fail:
+                self._errors += 1
+        if fail:
+            raise FakeRateLimitError("Rate limit reached (fake)")
+
+    def _respond(self, messages):
+        prompt = "\n".join(str(m.content) for m in messages)
+        text = (self.responder or default_responder)(prompt)
+        usage = {"input_tokens": estimate_tokens(prompt), "output_tokens": estimate_tokens(text)}
+        usage["total_tokens"] = usage["input_tokens"] + usage["output_tokens"]
+        with self._lock:
+            self._prompt_tokens += usage["input_tokens"]
+            self._completion_tokens += usage["output_tokens"]
+        message = AIMessage(content=text, usage_metadata=usage)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages: List, stop=None, run_manager=None, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        self._next_call()
+        return self._respond(messages)
+
+    async def _agenerate(self, messages: List, stop=None, run_manager=None, **kwargs):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self._next_call()
+        return self._respond(messages)
+
+    def _stream(self, messages: List, stop=None, run_manager=None, **kwargs):
+        # Same completion as _generate, in a few chunks split mid-item; usage comes with the last one
+        if self.latency:
+            time.sleep(self.latency)
+        self._next_call()
+        message = self._respond(messages).generations[0].message
+        text, size = message.content, max(len(message.content) // 8, 1)
+        for start in range(0, len(text), size):
+            last = start + size >= len(text)
+            yield ChatGenerationChunk(message=AIMessageChunk(
+                content=text[start:start + size], usage_metadata=message.usage_metadata if last else None))
+
+
+def _column_index(letters):
+    index = 0
+    for char in letters.upper():
+        index = index * 26 + ord(char) - 64
+    return index
+
+
+def _parse_cell(label):
+    """'B3' -> (3, 2); 'B' -> (None, 2); '3' -> (3, None)."""
+    letters = "".join(char for char in label if char.isalpha())
+    digits = "".join(char for char in label if char.isdigit())
+    return (int(digits) if digits else None), (_column_index(letters) if letters else None)
+
+
+def parse_range(range_name):
+    """A1 range -> (sheet title or None, first row, first col, last row or None, last col or None)."""
+    title = None
+    if "!" in range_name:
+        title, range_name = range_name.rsplit("!", 1)
+        title = title.strip("'")
+    start, _, end = range_name.partition(":")
+    row1, col1 = _parse_cell(start)
+    if not end:
+        return title, row1, col1, row1, col1
+    row2, col2 = _parse_cell(end)
+    return title, row1 or 1, col1 or 1, row2, col2
+
+
+class FakeCell:
+    def __init__(self, value):
+        self.value = value
+
+
+class FakeWorksheet:
+    """In-memory stand-in for gspread.Worksheet (the subset this project uses)."""
+
+    def __init__(self, spreadsheet, title, rows=None):
+        self.spreadsheet = spreadsheet
+        self.title = title
+        self.grid = [list(row) for row in (rows or [])]
+
+    def _call(self, kind):
+        self.spreadsheet.client.record(kind)
+
+    def _cell(self, row, col):
+        if row <= len(self.grid) and col <= len(self.grid[row - 1]):
+            return self.grid[row - 1][col - 1]
+        return ""
+
+    def _read(self, range_name):
+        _, row1, col1, row2, col2 = parse_range(range_name)
+        row2 = row2 or len(self.grid)
+        col2 = col2 or max((len(row) for row in self.grid), default=0)
+        rows = [[self._cell(r, c) for c in range(col1, col2 + 1)] for r in range(row1, row2 + 1)]
+        for row in rows:  # Sheets trims trailing empty cells and rows
+            while row and row[-1] == "":
+                row.pop()
+        while rows and not rows[-1]:
+            rows.pop()
+        return rows
+
+    def _write(self, row, col, value):
+        while len(self.grid) < row:
+            self.grid.append([])
+        line = self.grid[row - 1]
+        while len(line) < col:
+            line.append("")
+        line[col - 1] = value
+
+    def write_range(self, range_name, values):
+        _, row1, col1, _, _ = parse_range(range_name)
+        for r, row in enumerate(values):
+            for c, value in enumerate(row):
+                self._write(row1 + r, col1 + c, value)
+        self.spreadsheet.touch()
+
+    def get_all_values(self):
+        self._call("read")
+        width = max((len(row) for row in self.grid), default=0)
+        return [row + [""] * (width - len(row)) for row in self.grid]
+
+    def row_values(self, row):
+        self._call("read")
+        rows = self._read(f"{row}:{row}")
+        return rows[0] if rows else []
+
+    def col_values(self, col):
+        self._call("read")
+        return [self._cell(r, col) for r in range(1, len(self.grid) + 1)]
+
+    def acell(self, label):
+        self._call("read")
+        row, col = _parse_cell(label)
+        return FakeCell(self._cell(row, col))
+
+    def get(self, range_name):
+        self._call("read")
+        return self._read(range_name)
+
+    def batch_get(self, ranges):
+        self._call("read")
+        return [self._read(range_name) for range_name in ranges]
+
+    def update(self, range_name, values=None):
+        if isinstance(range_name, list):  # gspread 6 order: update(values, range_name)
+            range_name, values = values, range_name
+        self._call("write")
+        self.write_range(range_name, values)
+
+    def update_cell(self, row, col, value):
+        self._call("write")
+        self._write(row, col, value)
+        self.spreadsheet.touch()
+
+    def update_acell(self, label, value):
+        self._call("write")
+        row, col = _parse_cell(label)
+        self._write(row, col, value)
+        self.spreadsheet.touch()
+
+    def batch_update(self, data):
+        self._call("write")
+        for item in data:
+            self.write_range(item["range"], item["values"])
+
+    def clear(self):
+        self._call("write")
+        self.grid = []
+        self.spreadsheet.touch()
+
+
+class FakeSpreadsheet:
+    def __init__(self, client, title, worksheets):
+        self.client = client
+        self.title = title
+        self.id = hashlib.sha1(title.encode("utf-8")).hexdigest()
+        self.modified = 0
+        self.worksheets = {name: FakeWorksheet(self, name, rows) for name, rows in worksheets.items()}
+
+    def touch(self):
+        self.modified += 1
+
+    def worksheet(self, title):
+        self.client.record("read")
+        return self.worksheets[title]
+
+    def get_lastUpdateTime(self):
+        self.client.record("drive")
+        return f"2025-01-01T00:00:{self.modified:02d}Z"
+
+    def values_batch_update(self, body):
+        self.client.record("write")
+        for item in body["data"]:
+            title, *_ = parse_range(item["range"])
+            self.worksheets[title].write_range(item["range"].rsplit("!", 1)[-1], item["values"])
+
+
+class FakeGspreadClient:
+    """In-memory stand-in for an authorized gspread client; counts every simulated API call.
+
+    `spreadsheets` maps spreadsheet name -> {worksheet title: rows}. `latency`
+    is slept on every call to mimic the Sheets round-trip.
+    """
+
+    def __init__(self, spreadsheets, latency=0.0):
+        self.latency = latency
+        self.api_calls = Counter()
+        self._lock = threading.Lock()
+        self.spreadsheets = {name: FakeSpreadsheet(self, name, sheets) for name, sheets in spreadsheets.items()}
+
+    def record(self, kind):
+        with self._lock:
+            self.api_calls[kind] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def total_api_calls(self):
+        return sum(self.api_calls.values())
+
+    def open(self, name):
+        self.record("drive")
+        return self.spreadsheets[name]
+
+    def open_by_key(self, key):
+        self.record("read")
+        return next(sheet for sheet in self.spreadsheets.values() if sheet.id == key)
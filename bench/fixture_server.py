@@ -0,0 +1,81 @@
+"""Tiny local HTTP stand-in for getdaytrends (and any other fixture-backed endpoint)."""
+import json
+import os
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+TRENDS_FIXTURE = os.path.join(FIXTURES_DIR, "getdaytrends_saudi_arabia.html")
+
+
+def load_fixture(path=TRENDS_FIXTURE):
+    with open(path, "rb") as file:
+        return file.read()
+
+
+def render_trends_page(count):
+    """Synthetic getdaytrends page with `count` td.main cells, same markup as the saved fixture."""
+    rows = "\n".join(
+        f'<tr><th scope="row">{i}</th><td class="main"><a href="/saudi-arabia/trend/{i}/">#ترند_{i}</a>'
+        f'<div class="desc"><span class="small text-muted">{i * 1000} tweets</span></div></td>'
+        f'<td class="details">{i % 24}h</td></tr>'
+        for i in range(1, count + 1)
+    )
+    return f"<html><body><table class=\"table trends\"><tbody>{rows}</tbody></table></body></html>".encode("utf-8")
+
+
+def weather_payload(city="riyadh"):
+    """Minimal Visual Crossing timeline response with the fields get_weather_data reads."""
+    return json.dumps({
+        "address": city,
+        "days": [{"temp": 21.4, "humidity": 35.2, "conditions": "Clear",
+                  "description": "Clear conditions throughout the day."}],
+    }).encode("utf-8")
+
+
+def _make_handler(routes, latency):
+    class FixtureHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, so pooled clients reuse connections
+
+        def do_GET(self):
+            path = self.path.split("?", 1)[0]
+            route = routes.get(path)
+            if route is None:
+                self.send_error(404)
+                return
+            content_type, body = route
+            if callable(body):
+                body = body(self.path)
+            if latency:
+                threading.Event().wait(latency)
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return FixtureHandler
+
+
+@contextmanager
+def serve_fixtures(routes=None, latency=0.0):
+    """Serve `{path: (content_type, bytes | callable(path) -> bytes)}` on localhost.
+
+    Yields the base URL (no trailing slash). The default route mirrors
+    getdaytrends' /saudi-arabia/ page using the saved HTML fixture.
+    """
+    if routes is None:
+        routes = {"/saudi-arabia/": ("text/html; charset=utf-8", load_fixture())}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _make_handler(routes, latency))
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,140 @@
+import hashlib
+import json
+import os
+import threading
+
+# Rerun the LLM stages only when the trend delta reaches this (0 = always rerun)
+TREND_CHANGE_THRESHOLD = float(os.getenv("TREND_CHANGE_THRESHOLD", "0.2"))
+SNAPSHOT_PATH = os.getenv("CHANGE_SNAPSHOT_PATH", "change_snapshots.json")
+
+# Weight of set churn vs. rank movement in the delta
+SET_WEIGHT = 0.7
+RANK_WEIGHT = 0.3
+
+
+def trend_name(trend):
+    """First line of a scraped cell: the trend itself, without the tweet count that changes every scrape."""
+    return trend.split("\n", 1)[0].strip()
+
+
+def trend_delta(previous, current):
+    """How different two ranked trend lists are: 0.0 identical .. 1.0 nothing in common.
+
+    Mixes the Jaccard distance of the two sets with the mean rank displacement
+    of the trends present in both.
+    """
+    if not previous and not current:
+        return 0.0
+    if not previous or not current:
+        return 1.0
+    previous_rank = {}
+    for rank, trend in enumerate(previous):
+        previous_rank.setdefault(trend, rank)
+    current_rank = {}
+    for rank, trend in enumerate(current):
+        current_rank.setdefault(trend, rank)
+
+    common = previous_rank.keys() & current_rank.keys()
+    if not common:
+        return 1.0
+    set_delta = 1 - len(common) / len(previous_rank.keys() | current_rank.keys())
+    span = max(len(previous), len(current))
+    rank_delta = sum(abs(previous_rank[t] - current_rank[t]) for t in common) / (len(common) * span)
+    return SET_WEIGHT * set_delta + RANK_WEIGHT * rank_delta
+
+
+def fingerprint(*values):
+    """Stable hash of the non-trend inputs (history, weather, mode, ...)."""
+    payload = json.dumps(values, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ChangeDetector:
+    """Keeps the last trend snapshot (and per-query results) per job and decides what needs rerunning."""
+
+    def __init__(self, path=SNAPSHOT_PATH, threshold=TREND_CHANGE_THRESHOLD):
+        self.path = path
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._snapshots = self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r") as file:
+                return json.load(file)
+        except (json.JSONDecodeError, OSError):
+            print("Warning: Corrupt change snapshot file. Starting fresh...")
+            return {}
+
+    def _save(self):
+        with open(self.path + ".tmp", "w") as file:
+            json.dump(self._snapshots, file, ensure_ascii=False)
+        os.replace(self.path + ".tmp", self.path)
+
+    def delta(self, key, trends):
+        snapshot = self._snapshots.get(key)
+        if snapshot is None:
+            return 1.0
+        return trend_delta(snapshot["trends"], [trend_name(t) for t in trends])
+
+    def should_run(self, key, trends, inputs_fingerprint=None):
+        """True if the trends moved at least `threshold` or the other inputs changed since the last commit."""
+        with self._lock:
+            snapshot = self._snapshots.get(key)
+            delta = self.delta(key, trends)
+            if snapshot is None:
+                print(f"[{key}] No previous snapshot, running.")
+                return True
+            if inputs_fingerprint is not None and snapshot.get("fingerprint") != inputs_fingerprint:
+                print(f"[{key}] Inputs other than trends changed (delta {delta:.0%}), running.")
+                return True
+            if delta >= self.threshold:
+                print(f"[{key}] Trends changed by {delta:.0%} (threshold {self.threshold:.0%}), running.")
+                return True
+            print(f"[{key}] Trends changed by {delta:.0%} (< {self.threshold:.0%}) and other inputs unchanged, "
+                  "skipping the LLM stages.")
+            return False
+
+    def plan_queries(self, key, trends, queries):
+        """Split queries into (to_generate, reused {query: keywords}).
+
+        When the trends moved less than the threshold, only new queries are
+        generated and everything else reuses the last committed result.
+        """
+        with self._lock:
+            snapshot = self._snapshots.get(key)
+            delta = self.delta(key, trends)
+            if snapshot is None or delta >= self.threshold:
+                print(f"[{key}] Trends changed by {delta:.0%}, regenerating all {len(queries)} queries.")
+                return list(queries), {}
+            previous = snapshot.get("results", {})
+            to_generate = [query for query in queries if query not in previous]
+            reused = {query: previous[query] for query in queries if query in previous}
+            print(f"[{key}] Trends changed by {delta:.0%} (< {self.threshold:.0%}); generating "
+                  f"{len(to_generate)} new queries, reusing {len(reused)}.")
+            return to_generate, reused
+
+    def commit(self, key, trends, inputs_fingerprint=None, results=None):
+        """Record a successful run as the new baseline (trends=None keeps the previous trend baseline)."""
+        with self._lock:
+            previous = self._snapshots.get(key, {})
+            self._snapshots[key] = {
+                "trends": previous.get("trends", []) if trends is None else [trend_name(t) for t in trends],
+                "fingerprint": inputs_fingerprint,
+                "results": results or {},
+            }
+            self._save()
+
+
+_detector = None
+_detector_lock = threading.Lock()
+
+
+def get_change_detector():
+    global _detector
+    with _detector_lock:
+        if _detector is None:
+            _detector = ChangeDetector()
+        return _detector
@@ -0,0 +1,119 @@
+import glob
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+import metrics
+
+# Checkpoint settings
+CHECKPOINT_DIR = os.getenv("CHECKPOINT_DIR", "checkpoints")
+CHECKPOINT_RESUME = os.getenv("CHECKPOINT_RESUME", "1").lower() in ("1", "true", "yes")
+CHECKPOINT_MAX_AGE = int(os.getenv("CHECKPOINT_MAX_AGE", "3600"))  # older incomplete cycles start over
+CHECKPOINT_KEEP = int(os.getenv("CHECKPOINT_KEEP", "50"))  # finished cycles kept per pipeline for replay
+
+
+def input_hash(inputs):
+    """Stable hash of a stage's inputs."""
+    payload = json.dumps(inputs, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CycleCheckpoint:
+    """Persisted stage outputs of one pipeline cycle (one JSON file per cycle).
+
+    `stage(name, inputs, compute)` returns the saved output when the stage
+    already completed with the same inputs, and otherwise computes it and
+    saves it before returning, so a retried cycle only redoes the stages that
+    didn't finish. With `fresh_from`, that stage and every later one are
+    recomputed even if saved (used to replay a cycle's later stages).
+    """
+
+    def __init__(self, pipeline, cycle_id, stages=None, started=None, fresh_from=None):
+        self.pipeline = pipeline
+        self.cycle_id = cycle_id
+        self.stages = stages or {}
+        self.started = started or time.time()
+        self.status = "running"
+        self.fresh_from = fresh_from
+        self._fresh = False
+        self._lock = threading.Lock()
+
+    @property
+    def path(self):
+        return os.path.join(CHECKPOINT_DIR, self.pipeline, f"{self.cycle_id}.json")
+
+    def stage(self, name, inputs, compute):
+        key = input_hash(inputs)
+        self._fresh = self._fresh or name == self.fresh_from
+        saved = self.stages.get(name)
+        if saved is not None and saved["input_hash"] == key and not self._fresh:
+            print(f"♻️ [{self.pipeline}] Reusing checkpointed '{name}' from cycle {self.cycle_id}.")
+            return saved["output"]
+
+        output = compute()
+        with self._lock:
+            self.stages[name] = {"input_hash": key, "output": output, "saved": time.time()}
+            self.save()
+        return output
+
+    def complete(self):
+        with self._lock:
+            self.status = "complete"
+            self.save()
+        prune(self.pipeline)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path + ".tmp", "w") as file:
+            json.dump({
+                "pipeline": self.pipeline,
+                "cycle_id": self.cycle_id,
+                "started": self.started,
+                "status": self.status,
+                "stages": self.stages,
+            }, file, ensure_ascii=False, default=str)
+        os.replace(self.path + ".tmp", self.path)
+
+
+def load_checkpoint(pipeline, cycle_id, fresh_from=None):
+    """Load a saved cycle; raises FileNotFoundError if there is none."""
+    with open(os.path.join(CHECKPOINT_DIR, pipeline, f"{cycle_id}.json"), "r") as file:
+        data = json.load(file)
+    checkpoint = CycleCheckpoint(pipeline, data["cycle_id"], data["stages"], data["started"], fresh_from)
+    checkpoint.status = data["status"]
+    return checkpoint
+
+
+def _saved_cycles(pipeline):
+    """Saved cycle files of `pipeline`, newest first."""
+    paths = glob.glob(os.path.join(CHECKPOINT_DIR, pipeline, "*.json"))
+    return sorted(paths, key=os.path.getmtime, reverse=True)
+
+
+def open_checkpoint(pipeline, resume=CHECKPOINT_RESUME, max_age=CHECKPOINT_MAX_AGE):
+    """Checkpoint for a new cycle, or the latest incomplete one if resuming and it isn't too old."""
+    if resume:
+        for path in _saved_cycles(pipeline)[:1]:
+            try:
+                checkpoint = load_checkpoint(pipeline, os.path.basename(path)[:-len(".json")])
+            except (json.JSONDecodeError, OSError, KeyError):
+                print(f"⚠️ Unreadable checkpoint {path}, starting a new cycle.")
+                break
+            if checkpoint.status != "complete" and time.time() - checkpoint.started <= max_age:
+                print(f"⏯️ [{pipeline}] Resuming incomplete cycle {checkpoint.cycle_id} "
+                      f"(done: {', '.join(checkpoint.stages) or 'nothing'}).")
+                return checkpoint
+
+    cycle_metrics = metrics.current_cycle()
+    cycle_id = cycle_metrics.cycle_id if cycle_metrics is not None else uuid.uuid4().hex[:12]
+    return CycleCheckpoint(pipeline, cycle_id)
+
+
+def prune(pipeline, keep=CHECKPOINT_KEEP):
+    for path in _saved_cycles(pipeline)[keep:]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
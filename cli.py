@@ -0,0 +1,121 @@
+import argparse
+import sys
+import time
+
+# The job modules are imported inside each command, after the command's settings
+# are checked, and they only build clients (browser, Sheets, OpenAI) when first used,
+# so `--help` or `scrape-only` never load selenium, gspread or langchain.
+
+
+# Function to run the KSA job once, or on its interval with --loop
+def run_ksa(args):
+    import KeyWordsKSA as ksa
+
+    ksa.check_config()
+    regions = ksa.get_regions(args.regions or ksa.KSA_REGIONS)
+    while True:
+        ksa.run_ksa_job(regions)
+        if not args.loop:
+            return
+        print(f"⏳ Script will run again in {ksa.KSA_INTERVAL_SECONDS / 3600:g} hour(s)...\n")
+        time.sleep(ksa.KSA_INTERVAL_SECONDS)
+
+
+# Function to watch the input sheets, or check each of them once with --once
+def run_input(args):
+    import KeyWordsBasedOnInput as kbi
+    from sheet_watcher import InputSheetWatcher, watch
+    from sheets_gateway import get_gateway
+
+    kbi.check_config()
+    gateway = get_gateway()
+    sheet_names = [name.strip() for name in args.sheets.split(",") if name.strip()] if args.sheets \
+        else kbi.INPUT_SHEET_NAMES
+    watchers = [InputSheetWatcher(sheet_name, gateway) for sheet_name in sheet_names]
+    if not args.once:
+        watch(watchers, kbi.run_input_cycle)
+        return
+    for watcher in watchers:
+        queries = watcher.tick()
+        if queries is None:
+            print(f"'{watcher.sheet_name}' is not Ready, skipping.")
+        else:
+            kbi.run_input_cycle(watcher, queries)
+
+
+# Function to print the scraped trends of each region (no credentials needed)
+def scrape_only(args):
+    import KeyWordsKSA as ksa
+
+    for region in ksa.get_regions(args.regions or ksa.KSA_REGIONS):
+        trends = ksa.scrape_saudi_trends(region.trends_url)
+        print(f"\n[{region.name}] {len(trends)} trends from {region.trends_url}")
+        for rank, trend in enumerate(trends, 1):
+            print(f"{rank:>3}. {' '.join(trend.split())}")
+
+
+# Function to run the KSA stages for each region and print the keywords instead of writing them
+def dry_run(args):
+    import KeyWordsKSA as ksa
+
+    ksa.check_config()
+    results = ksa.run_regions(ksa.get_regions(args.regions or ksa.KSA_REGIONS), ksa.dry_run_cycle)
+    for name, keywords in results.items():
+        print(f"\n[{name}] {len(keywords or [])} keywords (not written):")
+        print(", ".join(keywords or []))
+
+
+# Function to re-run a saved KSA cycle from one stage on, offline
+def replay(args):
+    import KeyWordsKSA as ksa
+
+    ksa.check_config()
+    region = ksa.get_regions(args.region)[0]
+    keywords = ksa.replay_cycle(args.cycle_id, args.from_stage, region)
+    print(f"\n[{region.name}] {len(keywords or [])} keywords (not written):")
+    print(", ".join(keywords or []))
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="cli.py", description="Trending keyword jobs.")
+    commands = parser.add_subparsers(dest="command", required=True, metavar="command")
+
+    command = commands.add_parser("run-ksa", help="generate the trending keywords and write them to the sheets")
+    command.add_argument("--regions", help="comma-separated region names (default: KSA_REGIONS)")
+    command.add_argument("--loop", action="store_true", help="keep running every KSA_INTERVAL_SECONDS")
+    command.set_defaults(handler=run_ksa)
+
+    command = commands.add_parser("run-input", help="generate keywords for the queries of the input sheets")
+    command.add_argument("--sheets", help="comma-separated input sheet names (default: INPUT_SHEET_NAMES)")
+    command.add_argument("--once", action="store_true", help="check each sheet once instead of watching")
+    command.set_defaults(handler=run_input)
+
+    command = commands.add_parser("scrape-only", help="print the current trends, nothing else")
+    command.add_argument("--regions", help="comma-separated region names (default: KSA_REGIONS)")
+    command.set_defaults(handler=scrape_only)
+
+    command = commands.add_parser("dry-run", help="run the KSA pipeline without writing to the sheets")
+    command.add_argument("--regions", help="comma-separated region names (default: KSA_REGIONS)")
+    command.set_defaults(handler=dry_run)
+
+    command = commands.add_parser("replay", help="re-run a saved KSA cycle from a stage on, without writing")
+    command.add_argument("cycle_id")
+    command.add_argument("--from-stage", required=True, help="first stage to recompute, e.g. localize_keywords_ksa")
+    command.add_argument("--region", default="ksa")
+    command.set_defaults(handler=replay)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        args.handler(args)
+    except ValueError as e:  # missing settings, unknown region or stage
+        parser.exit(2, f"{e}\n")
+    except KeyboardInterrupt:
+        parser.exit(130, "Interrupted.\n")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
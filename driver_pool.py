@@ -0,0 +1,188 @@
+import atexit
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import psutil
+except ImportError:  # memory-based recycling is skipped without psutil
+    psutil = None
+
+# Pool settings
+DRIVER_POOL_SIZE = int(os.getenv("DRIVER_POOL_SIZE", "2"))
+DRIVER_MAX_USES = int(os.getenv("DRIVER_MAX_USES", "50"))
+DRIVER_MAX_MEMORY_MB = int(os.getenv("DRIVER_MAX_MEMORY_MB", "1024"))
+DRIVER_LEASE_TIMEOUT = int(os.getenv("DRIVER_LEASE_TIMEOUT", "120"))
+
+
+# selenium and webdriver_manager are imported on first use, so importing the jobs stays cheap
+def build_chrome_options():
+    from selenium.webdriver.chrome.options import Options
+
+    chrome_options = Options()
+    chrome_options.add_argument("--headless")
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    return chrome_options
+
+
+class DriverPool:
+    """Long-lived pool of headless Chrome drivers.
+
+    The chromedriver binary is resolved once per process, drivers are started
+    lazily up to `max_size`, checked before every lease, and recycled after
+    `max_uses` leases or when the browser's resident memory exceeds
+    `max_memory_mb`.
+    """
+
+    def __init__(self, max_size=DRIVER_POOL_SIZE, max_uses=DRIVER_MAX_USES,
+                 max_memory_mb=DRIVER_MAX_MEMORY_MB, lease_timeout=DRIVER_LEASE_TIMEOUT):
+        self.max_size = max_size
+        self.max_uses = max_uses
+        self.max_memory_mb = max_memory_mb
+        self.lease_timeout = lease_timeout
+        self._idle = queue.LifoQueue()  # LIFO hands out the most recently used (warmest) driver
+        self._uses = {}
+        self._created = 0
+        self._driver_path = None
+        self._path_lock = threading.Lock()
+        # Guards _created/_closed; notified whenever a driver is returned or a slot frees up
+        self._changed = threading.Condition(threading.Lock())
+        self._closed = False
+        if psutil is None and max_memory_mb:
+            print(f"⚠️ psutil is not installed: drivers will not be recycled above {max_memory_mb} MB "
+                  "(install the requirements to enable it).")
+
+    def _resolve_driver_path(self):
+        from webdriver_manager.chrome import ChromeDriverManager
+
+        with self._path_lock:
+            if self._driver_path is None:
+                self._driver_path = ChromeDriverManager().install()
+            return self._driver_path
+
+    def _create_driver(self):
+        from selenium import webdriver
+        from selenium.webdriver.chrome.service import Service
+
+        driver = webdriver.Chrome(service=Service(self._resolve_driver_path()), options=build_chrome_options())
+        self._uses[id(driver)] = 0
+        return driver
+
+    def _memory_mb(self, driver):
+        if psutil is None:
+            return 0.0
+        try:
+            process = psutil.Process(driver.service.process.pid)
+            processes = [process] + process.children(recursive=True)
+            return sum(p.memory_info().rss for p in processes) / (1024 * 1024)
+        except Exception:
+            return 0.0
+
+    def _is_healthy(self, driver):
+        try:
+            return driver.execute_script("return 1") == 1
+        except Exception:
+            return False
+
+    def _needs_recycle(self, driver):
+        if self._uses.get(id(driver), 0) >= self.max_uses:
+            return True
+        return self.max_memory_mb and self._memory_mb(driver) > self.max_memory_mb
+
+    def _discard(self, driver):
+        self._uses.pop(id(driver), None)
+        with self._changed:
+            self._created -= 1
+            self._changed.notify()
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def _reserve(self, deadline):
+        """Wait for an idle driver or a free slot; returns (driver, None) or (None, True) to create one."""
+        with self._changed:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Driver pool is closed")
+                try:
+                    return self._idle.get_nowait(), None
+                except queue.Empty:
+                    pass
+                if self._created < self.max_size:
+                    self._created += 1
+                    return None, True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"No browser became available within {self.lease_timeout}s")
+                self._changed.wait(remaining)
+
+    def _acquire(self):
+        deadline = time.monotonic() + self.lease_timeout
+        while True:
+            driver, create = self._reserve(deadline)
+            if create:
+                try:
+                    return self._create_driver()
+                except Exception:
+                    with self._changed:
+                        self._created -= 1
+                        self._changed.notify()
+                    raise
+
+            if self._is_healthy(driver):
+                return driver
+            print("⚠️ Discarding unhealthy browser from the pool.")
+            self._discard(driver)
+
+    def _release(self, driver):
+        self._uses[id(driver)] = self._uses.get(id(driver), 0) + 1
+        if self._closed or self._needs_recycle(driver):
+            self._discard(driver)
+            return
+        try:
+            driver.get("about:blank")  # drop the page so the idle browser stays small
+        except Exception:
+            self._discard(driver)
+            return
+        with self._changed:
+            self._idle.put(driver)
+            self._changed.notify()
+
+    @contextmanager
+    def lease(self):
+        """Borrow a warm driver for the duration of the `with` block."""
+        driver = self._acquire()
+        try:
+            yield driver
+        finally:
+            self._release(driver)
+
+    def close(self):
+        with self._changed:
+            self._closed = True
+            self._changed.notify_all()
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(driver)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_driver_pool():
+    """Return the process-wide driver pool, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = DriverPool()
+            atexit.register(_pool.close)
+        return _pool
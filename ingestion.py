@@ -0,0 +1,37 @@
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from metrics import run_in_context
+
+# name: label used in logs and results; fetch: zero-argument callable;
+# timeout: seconds allowed from the start of the stage; fallback: value used on timeout, error or None
+Source = namedtuple("Source", ["name", "fetch", "timeout", "fallback"])
+
+
+def run_sources(sources):
+    """Run every source concurrently and return {name: value}.
+
+    Each source is fetched exactly once. A source that fails, returns None or
+    misses its deadline yields its fallback, so the stage never takes longer
+    than the largest timeout.
+    """
+    executor = ThreadPoolExecutor(max_workers=len(sources), thread_name_prefix="ingest")
+    started = time.monotonic()
+    futures = {source.name: executor.submit(run_in_context(source.fetch)) for source in sources}
+    results = {}
+    try:
+        for source in sources:
+            remaining = max(0.0, source.timeout - (time.monotonic() - started))
+            try:
+                value = futures[source.name].result(timeout=remaining)
+            except TimeoutError:
+                print(f"⚠️ {source.name} did not respond within {source.timeout}s, using fallback.")
+                value = None
+            except Exception as e:
+                print(f"⚠️ {source.name} failed ({e}), using fallback.")
+                value = None
+            results[source.name] = source.fallback if value is None else value
+    finally:
+        # Don't wait for a hung source; its thread finishes (or dies) in the background
+        executor.shutdown(wait=False, cancel_futures=True)
+    return results
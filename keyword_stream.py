@@ -0,0 +1,180 @@
+import os
+import re
+from arabic_text import KeywordIndex, canonical
+from llm_cache import cached_invoke, cached_stream
+
+# Follow-up requests allowed when a streamed list comes back short
+KEYWORD_REPAIRS = int(os.getenv("KEYWORD_REPAIRS", "2"))
+
+# Item separators models use in keyword lists: Latin/Arabic commas and semicolons, newlines
+SEPARATOR_RE = re.compile(r"[,،;؛\n]")
+# List decoration in front of an item: bullets and numbering such as "1.", "٢)", "3 -"
+NUMBERING_RE = re.compile(r"^(?:[-*•·]+|[0-9٠-٩]+\s*[.)\-–:])\s*")
+QUOTES = "\"'`“”«»„‘’"
+# JSON array/object brackets left on the first and last items when a model answers in JSON
+BRACKETS = "[]{}"
+# Lead-in label on the first line of a response, e.g. "Keywords:" or "Here are 45 keywords:"
+# (the colon must be followed by a space or the end, so "الساعة 10:30" is left alone)
+LABEL_RE = re.compile(r"^\s*[^\W\d_][^:\n]*:(?:\s+|$)")
+# Items longer than this are prose ("Here are the keywords ...") rather than keywords
+MAX_ITEM_WORDS = 6
+
+# Appended to an agent's own prompt to ask for the missing items only
+TOP_UP_TEMPLATE = """
+
+    **Already generated** (do NOT repeat them or return variants of them): {existing_keywords}
+
+    **📝 Output Format:**
+    - Return ONLY {missing_count} NEW items that follow the rules above, as a comma-separated list.
+    """
+
+
+def clean_item(item):
+    """One list item without numbering, bullets, quotes, brackets or trailing punctuation."""
+    item = NUMBERING_RE.sub("", item.strip()).strip().strip(QUOTES + BRACKETS + ".!؟?").strip()
+    if len(item.split()) > MAX_ITEM_WORDS:
+        return ""
+    return item
+
+
+class KeywordStream:
+    """Incremental parser for a streamed keyword list.
+
+    Feed it completion chunks as they arrive. An item is cleaned and emitted as
+    soon as the separator after it is seen, once per canonical form (see
+    arabic_text), with `preferred` forms (the High keywords) kept verbatim.
+    Once `limit` keywords are collected, further items are ignored.
+    `on_keyword(keyword)` is called for every new keyword, so callers can start
+    on partial output.
+    """
+
+    def __init__(self, preferred=(), on_keyword=None, limit=None):
+        self.index = KeywordIndex(preferred)
+        self.on_keyword = on_keyword
+        self.limit = limit
+        self.duplicates = 0
+        self.overflow = 0
+        self._seeded = set()
+        self._buffer = ""
+        self._first = True  # the next non-empty item starts a response and may carry a label
+
+    def seed(self, keywords):
+        """Put `keywords` first, as given (e.g. the required High keywords); the model repeating them is fine."""
+        for keyword in keywords:
+            if self.index.add(keyword) and self.on_keyword is not None:
+                self.on_keyword(self.index.display(keyword))
+            self._seeded.add(canonical(keyword))
+
+    def full(self):
+        return self.limit is not None and len(self.index) >= self.limit
+
+    def feed(self, chunk):
+        """Parse a chunk; returns the keywords it completed."""
+        *items, self._buffer = SEPARATOR_RE.split(self._buffer + chunk)
+        return self.add(items)
+
+    def close(self):
+        """Flush the last item (the one without a trailing separator); the next chunk starts a new response."""
+        items, self._buffer = [self._buffer], ""
+        added = self.add(items)
+        self._first = True
+        return added
+
+    def add(self, items):
+        """Add raw items; returns the ones that were new."""
+        added = []
+        for item in items:
+            if self._first and item.strip():
+                item = LABEL_RE.sub("", item, count=1)  # "Keywords: مطر" -> "مطر"
+                self._first = False
+            keyword = clean_item(item)
+            if not keyword:
+                continue
+            if keyword in self.index:
+                if canonical(keyword) not in self._seeded:
+                    self.duplicates += 1
+                continue
+            if self.full():
+                self.overflow += 1
+                continue
+            self.index.add(keyword)
+            keyword = self.index.display(keyword)
+            added.append(keyword)
+            if self.on_keyword is not None:
+                self.on_keyword(keyword)
+        return added
+
+    def keywords(self):
+        return self.index.keywords()
+
+    def __len__(self):
+        return len(self.index)
+
+
+def parse_keywords(text, preferred=()):
+    """Keywords of a complete comma/newline separated list, deduplicated, preferred forms verbatim."""
+    stream = KeywordStream(preferred)
+    stream.feed(text)
+    stream.close()
+    return stream.keywords()
+
+
+def stream_keywords(template, model, inputs, required=(), minimum=0, maximum=None, on_keyword=None,
+                    limiter=None, repairs=KEYWORD_REPAIRS):
+    """Run a keyword-list prompt with a streamed completion and repair the list without regenerating it.
+
+    `required` keywords come first, verbatim, whether or not the model returns
+    them. Duplicates and junk items are dropped while the stream is parsed and
+    nothing beyond `maximum` keywords is kept. If fewer than `minimum` remain,
+    only the shortfall is requested from the model (the same prompt plus the
+    list so far), up to `repairs` times.
+    """
+    stream = KeywordStream(preferred=required, on_keyword=on_keyword, limit=maximum)
+    stream.seed(required)
+    # A list short of `minimum` is not cached, so the next run asks again instead of topping up the same answer
+    for chunk in cached_stream(template, model, inputs, limiter=limiter,
+                               validate=lambda content: len(parse_keywords(content)) >= minimum):
+        stream.feed(chunk)
+    stream.close()
+
+    if stream.duplicates:
+        print(f"⚠️ Dropped {stream.duplicates} duplicate keywords.")
+    if stream.overflow:
+        print(f"⚠️ Ignored {stream.overflow} keywords beyond the limit of {maximum}.")
+
+    return top_up_keywords(stream, template, model, inputs, minimum, limiter, repairs)
+
+
+def top_up_keywords(stream, template, model, inputs, minimum, limiter=None, repairs=KEYWORD_REPAIRS,
+                    top_up_template=TOP_UP_TEMPLATE, parse=None):
+    """Request only the keywords `stream` is short of `minimum` (the same prompt plus the list so far).
+
+    Up to `repairs` follow-ups are made; returns the stream's keywords. By
+    default the answer is streamed as a comma-separated list; prompts with
+    another output format pass their own `top_up_template` and a
+    `parse(content) -> [keywords]` for the complete answer.
+    """
+    maximum = stream.limit
+    for _ in range(repairs):
+        shortfall = minimum - len(stream)
+        if shortfall <= 0:
+            break
+        print(f"⚠️ Only {len(stream)} keywords (expected at least {minimum}), requesting {shortfall} more.")
+        # Extra items in the answer are ignored, the top-up only fills the shortfall
+        stream.limit = minimum
+        top_up_inputs = {
+            **inputs,
+            "existing_keywords": ", ".join(stream.keywords()),
+            "missing_count": shortfall,
+        }
+        validate = lambda content, wanted=shortfall: len((parse or parse_keywords)(content)) >= wanted
+        if parse is None:
+            for chunk in cached_stream(template + top_up_template, model, top_up_inputs, limiter=limiter,
+                                       validate=validate):
+                stream.feed(chunk)
+            stream.close()
+        else:
+            stream.add(parse(cached_invoke(template + top_up_template, model, top_up_inputs, limiter=limiter,
+                                           validate=validate)))
+    stream.limit = maximum
+    return stream.keywords()
@@ -0,0 +1,208 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import metrics
+from query_runner import estimate_tokens
+
+# Cache settings
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.sqlite3")
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", str(6 * 60 * 60)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2000"))
+LLM_CACHE_BYPASS = os.getenv("LLM_CACHE_BYPASS", "").lower() in ("1", "true", "yes")
+
+
+def normalize_inputs(value):
+    """Collapse whitespace in strings (recursively) so cosmetic differences don't miss the cache."""
+    if isinstance(value, str):
+        return " ".join(value.split())
+    if isinstance(value, (list, tuple)):
+        return [normalize_inputs(item) for item in value]
+    if isinstance(value, dict):
+        return {str(key): normalize_inputs(item) for key, item in value.items()}
+    return value
+
+
+def model_identity(model):
+    """(model name, temperature, bound kwargs) of a chat model, used as part of the cache key."""
+    bound_kwargs = dict(getattr(model, "kwargs", None) or {})  # model.bind(response_format=...) etc.
+    model = getattr(model, "bound", model)  # unwrap model.bind(...)
+    name = getattr(model, "model_name", None) or getattr(model, "model", None) or type(model).__name__
+    return str(name), getattr(model, "temperature", None), bound_kwargs
+
+
+def cache_key(model, template, inputs):
+    model_name, temperature, bound_kwargs = model_identity(model)
+    payload = json.dumps({
+        "model": model_name,
+        "temperature": temperature,
+        "bind": bound_kwargs,
+        "template": normalize_inputs(template),
+        "inputs": normalize_inputs(inputs),
+    }, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """Persistent (SQLite) response cache with TTL expiry and size-bounded LRU eviction."""
+
+    def __init__(self, path=LLM_CACHE_PATH, ttl=LLM_CACHE_TTL, max_entries=LLM_CACHE_MAX_ENTRIES,
+                 bypass=LLM_CACHE_BYPASS):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.bypass = bypass
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+
+    def get(self, key):
+        if self.bypass:
+            return None
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or (self.ttl and now - row[1] > self.ttl):
+                if row is not None:
+                    with self._conn:
+                        self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+            with self._conn:
+                self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return row[0]
+
+    def set(self, key, value):
+        if self.bypass:
+            return
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            # Evict least recently used entries beyond the size bound
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM responses")
+
+    def stats(self):
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "entries": size, "bypass": self.bypass}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache():
+    """Return the process-wide LLM response cache."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMCache()
+        return _cache
+
+
+def _chain(template, model):
+    # langchain is imported on the first model call, not when the jobs are imported
+    from langchain_core.prompts import ChatPromptTemplate
+
+    return ChatPromptTemplate.from_template(template) | model
+
+
+def _cached_content(cache, key, validate):
+    """The cached completion for `key`, unless there is none or it fails `validate`."""
+    content = cache.get(key)
+    if content is not None and validate is not None and not validate(content):
+        return None
+    return content
+
+
+def cached_invoke(template, model, inputs, cache=None, limiter=None, validate=None):
+    """Run `template | model` with `inputs`, returning the cached completion text when available.
+
+    With a `limiter`, a cache miss waits for its share of the rate limit first.
+    With `validate(content) -> bool`, only completions that pass it are cached
+    (a short or malformed answer is asked for again next time).
+    """
+    cache = cache or get_llm_cache()
+    key = cache_key(model, template, inputs)
+    content = _cached_content(cache, key, validate)
+    if content is None:
+        if limiter is not None:
+            limiter.acquire(estimate_tokens(template + json.dumps(inputs, ensure_ascii=False, default=str)))
+        chain = _chain(template, model)
+        message = chain.invoke(inputs)
+        metrics.record_llm_response(message)
+        content = message.content
+        if validate is None or validate(content):
+            cache.set(key, content)
+    else:
+        metrics.add(cache_hits=1)
+    return content
+
+
+def cached_stream(template, model, inputs, cache=None, limiter=None, validate=None):
+    """Streaming variant of cached_invoke: yields the completion text in chunks as they arrive.
+
+    A cached completion is yielded in one piece; a streamed one is cached once it has finished
+    (and passed `validate`, if given).
+    """
+    cache = cache or get_llm_cache()
+    key = cache_key(model, template, inputs)
+    content = _cached_content(cache, key, validate)
+    if content is not None:
+        metrics.add(cache_hits=1)
+        yield content
+        return
+
+    if limiter is not None:
+        limiter.acquire(estimate_tokens(template + json.dumps(inputs, ensure_ascii=False, default=str)))
+    chain = _chain(template, model)
+    message = None
+    for chunk in chain.stream(inputs):
+        message = chunk if message is None else message + chunk
+        if chunk.content:
+            yield chunk.content
+    if message is not None:
+        metrics.record_llm_response(message)
+        if validate is None or validate(message.content):
+            cache.set(key, message.content)
+
+
+async def acached_invoke(template, model, inputs, cache=None, limiter=None, tokens=None, validate=None):
+    """Async variant of cached_invoke; a miss waits (without blocking the loop) for `tokens` of the limiter."""
+    cache = cache or get_llm_cache()
+    key = cache_key(model, template, inputs)
+    content = _cached_content(cache, key, validate)
+    if content is None:
+        if limiter is not None:
+            await limiter.acquire_async(tokens or estimate_tokens(
+                template + json.dumps(inputs, ensure_ascii=False, default=str)))
+        chain = _chain(template, model)
+        message = await chain.ainvoke(inputs)
+        metrics.record_llm_response(message)
+        content = message.content
+        if validate is None or validate(content):
+            cache.set(key, content)
+    else:
+        metrics.add(cache_hits=1)
+    return content
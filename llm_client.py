@@ -0,0 +1,63 @@
+import asyncio
+import os
+import threading
+
+# Shared HTTP connection pool for all OpenAI calls in the process
+LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4o")
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "120"))
+
+_http_client = None
+_models = {}
+_loop = None
+_lock = threading.Lock()
+
+
+def get_http_client():
+    """Return the process-wide keep-alive HTTP client used by every chat model."""
+    import httpx
+
+    global _http_client
+    with _lock:
+        if _http_client is None:
+            _http_client = httpx.Client(
+                limits=httpx.Limits(max_connections=LLM_MAX_CONNECTIONS,
+                                    max_keepalive_connections=LLM_MAX_CONNECTIONS),
+                timeout=LLM_TIMEOUT,
+            )
+        return _http_client
+
+
+def get_chat_model(temperature, model=LLM_MODEL):
+    """Return the shared ChatOpenAI instance for (model, temperature).
+
+    Both jobs get their model from here, so a process running both of them
+    holds one client per setting and one connection pool between them. Async
+    calls keep the library's default client, which is tied to the event loop it
+    first ran on, so async callers go through run_async.
+    """
+    from langchain_openai import ChatOpenAI
+
+    http_client = get_http_client()
+    with _lock:
+        key = (model, temperature)
+        if key not in _models:
+            # stream_usage: streamed completions report token usage too (see metrics)
+            _models[key] = ChatOpenAI(model=model, temperature=temperature, http_client=http_client,
+                                      stream_usage=True)
+        return _models[key]
+
+
+def run_async(coroutine):
+    """Run `coroutine` on the process-wide event loop and return its result.
+
+    Used instead of asyncio.run, which would give every job run a new loop while
+    the shared models' async clients stay bound to the first one ("Event loop is
+    closed" on every later run). The loop lives in a daemon thread.
+    """
+    global _loop
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="llm-event-loop", daemon=True).start()
+    return asyncio.run_coroutine_threadsafe(coroutine, _loop).result()
@@ -0,0 +1,202 @@
+import contextvars
+import cProfile
+import functools
+import inspect
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+# Metrics settings
+METRICS_DIR = os.getenv("METRICS_DIR", "metrics")
+METRICS_FORMAT = os.getenv("METRICS_FORMAT", "both")  # "jsonl", "prometheus" or "both"
+METRICS_PROFILE = os.getenv("METRICS_PROFILE", "").lower() in ("1", "true", "yes")
+
+COUNTERS = ("retries", "prompt_tokens", "completion_tokens", "bytes", "api_calls", "cache_hits", "errors")
+
+_current_cycle = contextvars.ContextVar("metrics_cycle", default=None)
+_current_stage = contextvars.ContextVar("metrics_stage", default=None)
+
+# Process-lifetime totals, exported as Prometheus counters
+_totals = {}
+_totals_lock = threading.Lock()
+
+
+class CycleMetrics:
+    """Per-stage aggregates for one pipeline cycle."""
+
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+        self.cycle_id = uuid.uuid4().hex[:12]
+        self.started = time.time()
+        self.duration = 0.0
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    def add_stage(self, name, duration, counters):
+        with self._lock:
+            stage = self.stages.setdefault(name, dict(calls=0, seconds=0.0, max_seconds=0.0, **dict.fromkeys(COUNTERS, 0)))
+            stage["calls"] += 1
+            stage["seconds"] += duration
+            stage["max_seconds"] = max(stage["max_seconds"], duration)
+            for key in COUNTERS:
+                stage[key] += counters[key]
+
+    def to_dict(self):
+        totals = {key: sum(stage[key] for stage in self.stages.values()) for key in COUNTERS}
+        return {
+            "pipeline": self.pipeline,
+            "cycle_id": self.cycle_id,
+            "started": datetime.fromtimestamp(self.started, timezone.utc).isoformat(),
+            "duration_seconds": round(self.duration, 4),
+            "stages": self.stages,
+            "totals": totals,
+        }
+
+
+def current_cycle():
+    """The active cycle's CycleMetrics, or None outside a cycle."""
+    return _current_cycle.get()
+
+
+def add(**counters):
+    """Add counters (retries, tokens, bytes, api_calls, ...) to the innermost active stage."""
+    record = _current_stage.get()
+    if record is None:
+        return
+    with record["lock"]:
+        for key, value in counters.items():
+            record[key] += value
+
+
+def record_llm_response(message):
+    """Count one model request and its token usage (if the provider reported it)."""
+    usage = getattr(message, "usage_metadata", None) or {}
+    add(api_calls=1,
+        prompt_tokens=usage.get("input_tokens", 0),
+        completion_tokens=usage.get("output_tokens", 0))
+
+
+@contextmanager
+def stage(name):
+    """Time a hot-path stage and collect the counters added while it runs."""
+    record = dict.fromkeys(COUNTERS, 0)
+    record["lock"] = threading.Lock()
+    token = _current_stage.set(record)
+    start = time.perf_counter()
+    try:
+        yield record
+    except Exception:
+        record["errors"] += 1
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        _current_stage.reset(token)
+        cycle_metrics = _current_cycle.get()
+        if cycle_metrics is not None:
+            cycle_metrics.add_stage(name, duration, record)
+
+
+def instrumented(name):
+    """Decorator form of `stage` for sync and async functions."""
+    def decorator(function):
+        if inspect.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def async_wrapper(*args, **kwargs):
+                with stage(name):
+                    return await function(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def cycle(pipeline, profile=METRICS_PROFILE):
+    """Collect metrics for one pipeline cycle and export them when it ends.
+
+    With `profile=True` the cycle also runs under cProfile; the stats are saved
+    next to the metrics and the top entries are printed.
+    """
+    cycle_metrics = CycleMetrics(pipeline)
+    token = _current_cycle.set(cycle_metrics)
+    profiler = cProfile.Profile() if profile else None
+    if profiler:
+        profiler.enable()
+    start = time.perf_counter()
+    try:
+        yield cycle_metrics
+    finally:
+        cycle_metrics.duration = time.perf_counter() - start
+        if profiler:
+            profiler.disable()
+        _current_cycle.reset(token)
+        try:
+            export_cycle(cycle_metrics, profiler)
+        except OSError as e:
+            print(f"⚠️ Could not write metrics: {e}")
+
+
+def export_cycle(cycle_metrics, profiler=None):
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    pipeline = cycle_metrics.pipeline
+    with _totals_lock:
+        for name, values in cycle_metrics.stages.items():
+            totals = _totals.setdefault((pipeline, name), dict.fromkeys(("calls", "seconds") + COUNTERS, 0))
+            for key in totals:
+                totals[key] += values[key]
+
+    if METRICS_FORMAT in ("jsonl", "both"):
+        with open(os.path.join(METRICS_DIR, f"{pipeline}.jsonl"), "a") as file:
+            file.write(json.dumps(cycle_metrics.to_dict(), ensure_ascii=False) + "\n")
+
+    if METRICS_FORMAT in ("prometheus", "both"):
+        path = os.path.join(METRICS_DIR, f"{pipeline}.prom")
+        with open(path + ".tmp", "w") as file:
+            file.write(prometheus_text(cycle_metrics))
+        os.replace(path + ".tmp", path)  # node_exporter textfile collectors must never see a partial file
+
+    if profiler is not None:
+        profile_path = os.path.join(METRICS_DIR, f"{pipeline}-{cycle_metrics.cycle_id}.prof")
+        profiler.dump_stats(profile_path)
+        output = io.StringIO()
+        pstats.Stats(profiler, stream=output).sort_stats("cumulative").print_stats(20)
+        print(f"cProfile stats saved to {profile_path}\n{output.getvalue()}")
+
+
+def prometheus_text(cycle_metrics):
+    """Last-cycle gauges plus process-lifetime counters in Prometheus text format."""
+    pipeline = cycle_metrics.pipeline
+    lines = [
+        "# TYPE keywords_cycle_duration_seconds gauge",
+        f'keywords_cycle_duration_seconds{{pipeline="{pipeline}"}} {cycle_metrics.duration:.6f}',
+        "# TYPE keywords_cycle_timestamp_seconds gauge",
+        f'keywords_cycle_timestamp_seconds{{pipeline="{pipeline}"}} {cycle_metrics.started:.0f}',
+        "# TYPE keywords_stage_duration_seconds gauge",
+    ]
+    for name, values in cycle_metrics.stages.items():
+        lines.append(f'keywords_stage_duration_seconds{{pipeline="{pipeline}",stage="{name}"}} {values["seconds"]:.6f}')
+
+    with _totals_lock:
+        totals = {key: dict(values) for key, values in _totals.items() if key[0] == pipeline}
+    for counter in ("calls", "seconds") + COUNTERS:
+        metric = f"keywords_stage_{counter}_total"
+        lines.append(f"# TYPE {metric} counter")
+        for (_, name), values in totals.items():
+            lines.append(f'{metric}{{pipeline="{pipeline}",stage="{name}"}} {values[counter]}')
+    return "\n".join(lines) + "\n"
+
+
+def run_in_context(function):
+    """Bind `function` to the caller's metrics context, for handing work to another thread."""
+    context = contextvars.copy_context()
+    return functools.partial(context.run, function)
@@ -0,0 +1,156 @@
+import asyncio
+import os
+import random
+import threading
+import time
+import metrics
+
+# Process-wide OpenAI budget, shared by every job and region
+OPENAI_RPM = int(os.getenv("OPENAI_RPM", "500"))
+OPENAI_TPM = int(os.getenv("OPENAI_TPM", "30000"))
+
+
+def estimate_tokens(text):
+    """Rough token estimate (about 4 characters per token) used for rate limiting."""
+    return len(text) // 4 + 1
+
+
+def is_rate_limit_error(error):
+    """Return True if the exception looks like an HTTP 429 / rate-limit error."""
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    return status == 429 or "ratelimit" in type(error).__name__.lower()
+
+
+class RateLimiter:
+    """Thread-safe requests-per-minute / tokens-per-minute limiter.
+
+    Each call reserves its share of the budget up front and is told how long to
+    wait, so callers are served in arrival order whether they are threads or
+    asyncio tasks. A limit of None disables that dimension.
+    """
+
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._requests = float(requests_per_minute or 0)
+        self._tokens = float(tokens_per_minute or 0)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens):
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - self._last
+            self._last = now
+            wait = 0.0
+
+            if self.requests_per_minute:
+                rate = self.requests_per_minute / 60.0
+                self._requests = min(self.requests_per_minute, self._requests + elapsed * rate) - 1
+                if self._requests < 0:
+                    wait = max(wait, -self._requests / rate)
+
+            if self.tokens_per_minute:
+                rate = self.tokens_per_minute / 60.0
+                self._tokens = min(self.tokens_per_minute, self._tokens + elapsed * rate) - tokens
+                if self._tokens < 0:
+                    wait = max(wait, -self._tokens / rate)
+
+            return wait
+
+    def acquire(self, tokens=1):
+        """Block the calling thread until the request fits in the budget."""
+        wait = self._reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens=1):
+        """Wait (without blocking the event loop) until the request fits in the budget."""
+        wait = self._reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """Return the process-wide OpenAI rate limiter (reservations are served in arrival order)."""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = RateLimiter(requests_per_minute=OPENAI_RPM, tokens_per_minute=OPENAI_TPM)
+        return _limiter
+
+
+def backoff_delay(attempt, error, base_delay=1.0, max_delay=60.0):
+    """Exponential backoff with jitter; rate-limit errors back off harder."""
+    retry_after = getattr(error, "retry_after", None)
+    if retry_after:
+        return float(retry_after)
+    delay = base_delay * (2 ** attempt) * (1 + random.random())
+    if is_rate_limit_error(error):
+        delay *= 2
+    return min(delay, max_delay)
+
+
+async def run_with_retries(item, invoke, semaphore, limiter=None, tokens=1, max_retries=3, base_delay=1.0):
+    """Await `invoke(item)` under the semaphore and limiter, retrying with backoff on errors.
+
+    Calls that may be answered from the LLM cache should charge the limiter
+    themselves on a miss (acached_invoke) and pass no `limiter` here.
+    """
+    for attempt in range(max_retries + 1):
+        async with semaphore:
+            if limiter is not None:
+                await limiter.acquire_async(tokens)
+            try:
+                return await invoke(item)
+            except Exception as e:
+                error = e
+
+        if attempt == max_retries:
+            raise error
+        delay = backoff_delay(attempt, error, base_delay)
+        metrics.add(retries=1)
+        print(f"Retrying '{item}' in {delay:.1f}s (attempt {attempt + 1}/{max_retries}) after error: {error}")
+        await asyncio.sleep(delay)
+
+
+async def run_concurrently(items, invoke, concurrency=8, limiter=None, tokens_per_call=1,
+                           max_retries=3, base_delay=1.0):
+    """Run the coroutine function `invoke` over `items` with a concurrency cap.
+
+    Returns a list aligned with `items`; each entry is either the result or the
+    exception raised by the final attempt.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    tasks = [
+        run_with_retries(item, invoke, semaphore, limiter, tokens_per_call, max_retries, base_delay)
+        for item in items
+    ]
+    return await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def pack_batches(items, token_budget, fixed_tokens, output_tokens_per_item, max_output_tokens, max_items=None):
+    """Greedily pack `items` (strings) into batches that fit the prompt and completion budgets.
+
+    A batch costs `fixed_tokens` (shared context) plus each item's tokens and its
+    expected completion; every batch holds at least one item.
+    """
+    batches = []
+    batch, used = [], fixed_tokens
+    for item in items:
+        cost = estimate_tokens(item) + output_tokens_per_item
+        full = (used + cost > token_budget
+                or (len(batch) + 1) * output_tokens_per_item > max_output_tokens
+                or (max_items and len(batch) >= max_items))
+        if batch and full:
+            batches.append(batch)
+            batch, used = [], fixed_tokens
+        batch.append(item)
+        used += cost
+    if batch:
+        batches.append(batch)
+    return batches
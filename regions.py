@@ -0,0 +1,71 @@
+import os
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from trends_fetcher import TRENDS_URL
+
+# Regions processed concurrently per cycle
+REGION_WORKERS = int(os.getenv("REGION_WORKERS", "4"))
+
+# name: short id (change-detector key and metrics pipeline name); market: place named in the prompts;
+# audience: adjective for the market's audience and culture ("Saudi"); dialect: dialect the keywords are written in;
+# trends_url: getdaytrends page; weather_location: Visual Crossing location;
+# history_sheet: spreadsheet with the "Keyword rate" tab; target_sheet: spreadsheet with the "Keywords" tab
+Region = namedtuple("Region", ["name", "market", "audience", "dialect", "trends_url", "weather_location",
+                               "history_sheet", "target_sheet"])
+
+
+def _region(name, market, audience, dialect, trends_path, weather_location):
+    """Region following the sheet naming convention "Target - <market>" / "Trending Keywords <market>"."""
+    return Region(name, market, audience, dialect, f"https://getdaytrends.com/{trends_path}/", weather_location,
+                  f"Target - {market}", f"Trending Keywords {market}")
+
+
+REGIONS = {region.name: region for region in [
+    # The original pipeline and its sheets
+    Region("ksa", "Saudi Arabia", "Saudi", "Saudi dialects (Najdi, Hijazi)", TRENDS_URL, "riyadh",
+           "Target", "Trending Keywords Saudi Based on Input"),
+
+    # Other Gulf markets
+    _region("uae", "UAE", "Emirati", "Emirati dialect", "united-arab-emirates", "dubai"),
+    _region("kuwait", "Kuwait", "Kuwaiti", "Kuwaiti dialect", "kuwait", "kuwait"),
+    _region("qatar", "Qatar", "Qatari", "Qatari dialect", "qatar", "doha"),
+    _region("bahrain", "Bahrain", "Bahraini", "Bahraini dialect", "bahrain", "manama"),
+    _region("oman", "Oman", "Omani", "Omani dialect", "oman", "muscat"),
+
+    # Saudi cities
+    _region("riyadh", "Riyadh", "Saudi", "Najdi dialect", "saudi-arabia/riyadh", "riyadh"),
+    _region("jeddah", "Jeddah", "Saudi", "Hijazi dialect", "saudi-arabia/jeddah", "jeddah"),
+    _region("mecca", "Mecca", "Saudi", "Hijazi dialect", "saudi-arabia/mecca", "mecca"),
+    _region("medina", "Medina", "Saudi", "Hijazi dialect", "saudi-arabia/medina", "medina"),
+    _region("dammam", "Dammam", "Saudi", "Eastern Province (Sharqawi) dialect", "saudi-arabia/dammam", "dammam"),
+]}
+
+
+def get_regions(names):
+    """Comma-separated names (or a list) -> [Region, ...]; raises ValueError on an unknown name."""
+    if isinstance(names, str):
+        names = [name.strip() for name in names.split(",") if name.strip()]
+    unknown = [name for name in names if name not in REGIONS]
+    if unknown:
+        raise ValueError(f"Error: Unknown region(s) {', '.join(unknown)}. Known: {', '.join(REGIONS)}")
+    return [REGIONS[name] for name in names]
+
+
+def run_regions(regions, run_region, max_workers=REGION_WORKERS):
+    """Run `run_region(region)` for every region concurrently and return {name: result}.
+
+    Regions only share process-wide resources (HTTP session, driver pool, LLM
+    rate limiter), each of which serves waiters in arrival order, so no region
+    can starve the others. A failing region yields None without affecting the rest.
+    """
+    results = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(regions))),
+                            thread_name_prefix="region") as executor:
+        futures = {region.name: executor.submit(run_region, region) for region in regions}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                print(f"❌ Region '{name}' failed: {e}")
+                results[name] = None
+    return results
@@ -0,0 +1,237 @@
+import os
+import queue
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+# Scheduler settings
+SCHEDULER_WORKERS = int(os.getenv("SCHEDULER_WORKERS", "4"))
+MAX_IDLE_SECONDS = 30  # upper bound on one sleep of the scheduler loop
+
+
+class IntervalTrigger:
+    """Fires every `seconds`, measured from the previous scheduled start."""
+
+    def __init__(self, seconds, run_immediately=True):
+        self.seconds = seconds
+        self.next_run = time.time() + (0 if run_immediately else seconds)
+
+    def due(self, now):
+        if now < self.next_run:
+            return []
+        while self.next_run <= now:  # a long run skips missed slots instead of bursting
+            self.next_run += self.seconds
+        return [(None, ())]
+
+    def next_due(self):
+        return self.next_run
+
+    def finished(self, key, result):
+        pass
+
+    def skipped(self, key):
+        pass
+
+
+def _parse_cron_field(field, low, high):
+    values = set()
+    for part in field.split(","):
+        spec, _, step = part.partition("/")
+        step = int(step) if step else 1
+        if spec == "*":
+            first, last = low, high
+        elif "-" in spec:
+            first, last = (int(value) for value in spec.split("-", 1))
+        else:
+            first = int(spec)
+            last = high if step > 1 else first
+        if not low <= first <= last <= high or step < 1:
+            raise ValueError(f"Invalid cron field '{field}' (allowed {low}-{high})")
+        values.update(range(first, last + 1, step))
+    return values
+
+
+class CronTrigger:
+    """Fires on a 5-field cron expression (minute hour day-of-month month day-of-week), local time."""
+
+    def __init__(self, expression):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs 5 fields, got '{expression}'")
+        self.expression = expression
+        self.minutes = _parse_cron_field(fields[0], 0, 59)
+        self.hours = _parse_cron_field(fields[1], 0, 23)
+        self.days = _parse_cron_field(fields[2], 1, 31)
+        self.months = _parse_cron_field(fields[3], 1, 12)
+        self.weekdays = {day % 7 for day in _parse_cron_field(fields[4], 0, 7)}  # 0 and 7 are Sunday
+        self.any_day = fields[2] == "*"
+        self.any_weekday = fields[4] == "*"
+        self.next_run = self.next_after(datetime.now()).timestamp()
+
+    def _day_matches(self, moment):
+        day_ok = moment.day in self.days
+        weekday_ok = (moment.weekday() + 1) % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return day_ok and weekday_ok
+        return day_ok or weekday_ok  # cron ORs the two day fields when both are restricted
+
+    def next_after(self, moment):
+        """First matching minute strictly after `moment`."""
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=366 * 5)
+        while candidate < limit:
+            if candidate.month not in self.months:
+                candidate = (candidate.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(candidate):
+                candidate = candidate.replace(hour=0, minute=0) + timedelta(days=1)
+            elif candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        raise ValueError(f"Cron expression '{self.expression}' never fires")
+
+    def due(self, now):
+        if now < self.next_run:
+            return []
+        self.next_run = self.next_after(datetime.fromtimestamp(now)).timestamp()
+        return [(None, ())]
+
+    def next_due(self):
+        return self.next_run
+
+    def finished(self, key, result):
+        pass
+
+    def skipped(self, key):
+        pass
+
+
+class SheetReadyTrigger:
+    """Fires `(watcher, queries)` whenever an input sheet's status becomes ready.
+
+    Polling follows each watcher's own adaptive interval; a run that returns
+    False is retried after its watcher's failure backoff. A firing skipped because
+    the sheet's previous run is still going is re-armed, so the request fires
+    again on a later poll instead of being lost.
+    """
+
+    def __init__(self, watchers):
+        self.watchers = {watcher.sheet_name: watcher for watcher in watchers}
+
+    def due(self, now):
+        fired = []
+        for name, watcher in self.watchers.items():
+            if watcher.next_check > time.monotonic():
+                continue
+            queries = watcher.tick()
+            if queries is not None:
+                fired.append((name, (watcher, queries)))
+        return fired
+
+    def next_due(self):
+        next_check = min(watcher.next_check for watcher in self.watchers.values())
+        return time.time() + (next_check - time.monotonic())
+
+    def finished(self, key, result):
+        if result is False:
+            self.watchers[key].failed()
+        elif result is True:
+            self.watchers[key].mark_done()
+
+    def skipped(self, key):
+        self.watchers[key].rearm()
+
+
+class Scheduler:
+    """Runs several jobs in one process on their own triggers.
+
+    Jobs run on a shared thread pool, so they share everything the process
+    holds (browser pool, sheets gateway, LLM clients). A job never overlaps
+    itself: a trigger that fires while the previous run with the same key is
+    still going is skipped. SIGINT/SIGTERM stop new runs and wait for running
+    ones to finish; a second signal exits immediately.
+    """
+
+    def __init__(self, max_workers=SCHEDULER_WORKERS):
+        self.max_workers = max_workers
+        self._jobs = []
+        self._running = set()  # (job name, key) currently running
+        self._finished = queue.SimpleQueue()
+        self._stop = threading.Event()
+
+    def add_job(self, name, trigger, function):
+        """Register `function`; it is called with the arguments each trigger firing provides."""
+        self._jobs.append((name, trigger, function))
+
+    def stop(self, *_):
+        if self._stop.is_set():
+            raise KeyboardInterrupt
+        print("🛑 Stopping: no new runs will start, waiting for running jobs to finish...")
+        self._stop.set()
+
+    def _run(self, name, key, function, args):
+        try:
+            result = function(*args)
+        except Exception as e:
+            print(f"❌ Job '{name}' failed: {e}")
+            result = False
+        self._finished.put((name, key, result))
+
+    def _collect_finished(self, triggers):
+        while True:
+            try:
+                name, key, result = self._finished.get_nowait()
+            except queue.Empty:
+                return
+            self._running.discard((name, key))
+            triggers[name].finished(key, result)
+
+    def run(self):
+        """Run until stopped by a signal or `stop()`."""
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, self.stop)
+
+        triggers = {name: trigger for name, trigger, _ in self._jobs}
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="job")
+        try:
+            while not self._stop.is_set():
+                self._collect_finished(triggers)
+                for name, trigger, function in self._jobs:
+                    for key, args in trigger.due(time.time()):
+                        if (name, key) in self._running:
+                            label = f"{name} ({key})" if key else name
+                            print(f"⏭️ Job '{label}' is still running, skipping this trigger.")
+                            trigger.skipped(key)
+                            continue
+                        self._running.add((name, key))
+                        executor.submit(self._run, name, key, function, args)
+                next_due = min(trigger.next_due() for trigger in triggers.values())
+                self._stop.wait(max(0.5, min(next_due - time.time(), MAX_IDLE_SECONDS)))
+        finally:
+            executor.shutdown(wait=True)
+            print("Scheduler stopped.")
+
+
+# One process for both jobs: one browser pool, one sheets gateway, one LLM connection pool
+if __name__ == "__main__":
+    import KeyWordsBasedOnInput
+    import KeyWordsKSA
+    from sheet_watcher import InputSheetWatcher
+    from sheets_gateway import get_gateway
+
+    KeyWordsKSA.check_config()
+    KeyWordsBasedOnInput.check_config()
+    gateway = get_gateway()
+    scheduler = Scheduler()
+    if KeyWordsKSA.KSA_CRON:
+        ksa_trigger = CronTrigger(KeyWordsKSA.KSA_CRON)
+    else:
+        ksa_trigger = IntervalTrigger(KeyWordsKSA.KSA_INTERVAL_SECONDS)
+    scheduler.add_job("ksa", ksa_trigger, KeyWordsKSA.run_ksa_job)
+    watchers = [InputSheetWatcher(sheet_name, gateway) for sheet_name in KeyWordsBasedOnInput.INPUT_SHEET_NAMES]
+    scheduler.add_job("input", SheetReadyTrigger(watchers), KeyWordsBasedOnInput.run_input_cycle)
+    scheduler.run()
@@ -0,0 +1,114 @@
+import time
+from metrics import instrumented
+
+# Polling settings
+MIN_POLL_INTERVAL = 10
+MAX_POLL_INTERVAL = 300
+BACKOFF_FACTOR = 2
+
+
+class InputSheetWatcher:
+    """Watches an INPUT worksheet's status cell and query column with one read per tick.
+
+    The status cell and the query column are fetched together in a single
+    batched range read. The job is triggered only when the status changes to
+    `ready_value`; while nothing changes the poll interval doubles up to
+    `max_interval`, and snaps back to `min_interval` on any change. After a
+    failed run the sheet is retried with the same doubling delay per
+    consecutive failure, so a sheet left on Ready is not re-run in a loop.
+    """
+
+    def __init__(self, sheet_name, gateway, worksheet="INPUT", status_cell="D2", query_column="A",
+                 ready_value="Ready", done_value="Not Ready", min_interval=MIN_POLL_INTERVAL,
+                 max_interval=MAX_POLL_INTERVAL, backoff_factor=BACKOFF_FACTOR):
+        self.sheet_name = sheet_name
+        self.gateway = gateway
+        self.worksheet = worksheet
+        self.status_cell = status_cell
+        self.query_column = query_column
+        self.ready_value = ready_value
+        self.done_value = done_value
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff_factor = backoff_factor
+        self.interval = min_interval
+        self.next_check = 0.0
+        self.status = None
+        self.failures = 0
+        self._snapshot = None
+
+    @instrumented("sheet_poll")
+    def poll(self):
+        """Read the status cell and the query column in one request; returns (status, queries)."""
+        worksheet = self.gateway.worksheet(self.sheet_name, self.worksheet)
+        status_range, query_range = worksheet.batch_get(
+            [self.status_cell, f"{self.query_column}:{self.query_column}"]
+        )
+        status = status_range[0][0] if status_range and status_range[0] else ""
+        queries = [row[0].strip() for row in query_range if row and row[0].strip()]
+        return status, queries
+
+    def tick(self):
+        """Poll once. Returns the queries if the status just became ready, otherwise None."""
+        try:
+            status, queries = self.poll()
+        except Exception as e:
+            print(f"Error polling '{self.sheet_name}': {e}")
+            self.gateway.drop_stale(self.sheet_name, e)
+            self._schedule(changed=False)
+            return None
+
+        snapshot = (status, tuple(queries))
+        changed = snapshot != self._snapshot
+        triggered = status == self.ready_value and self.status != self.ready_value
+        self.status = status
+        self._snapshot = snapshot
+        self._schedule(changed)
+        return queries if triggered else None
+
+    def failed(self):
+        """Retry a still-ready sheet after a failed run, waiting longer after each consecutive failure."""
+        self.rearm()
+        self.failures += 1
+        delay = min(self.max_interval, self.min_interval * self.backoff_factor ** (self.failures - 1))
+        self.next_check = time.monotonic() + delay
+
+    def rearm(self):
+        """Forget the last seen status so a still-ready sheet triggers again on its next poll."""
+        self.status = None
+
+    def mark_done(self):
+        """Record the status a finished run wrote, so a quick new "Ready" is seen as a change."""
+        self.status = self.done_value
+        self.failures = 0
+        self._snapshot = None
+
+    def _schedule(self, changed):
+        if changed:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.max_interval, self.interval * self.backoff_factor)
+        self.next_check = time.monotonic() + self.interval
+
+
+def watch(watchers, on_ready, should_stop=lambda: False):
+    """Poll every watcher when it is due and call `on_ready(watcher, queries)` on each trigger.
+
+    If `on_ready` returns False the sheet is retried after a backoff; if it
+    returns True (the job wrote `done_value` to the status cell) the watcher records that.
+    """
+    while not should_stop():
+        now = time.monotonic()
+        for watcher in watchers:
+            if watcher.next_check > now:
+                continue
+            queries = watcher.tick()
+            if queries is None:
+                continue
+            result = on_ready(watcher, queries)
+            if result is False:
+                watcher.failed()
+            elif result is True:
+                watcher.mark_done()
+        next_due = min(watcher.next_check for watcher in watchers)
+        time.sleep(max(0.5, min(next_due - time.monotonic(), MIN_POLL_INTERVAL)))
@@ -0,0 +1,163 @@
+import threading
+import weakref
+from collections import namedtuple
+from sheets_gateway import get_gateway
+
+# title: worksheet title; cells: {(row, col): value} (1-based);
+# region: (first_row, first_col, last_col) whose previously written cells not in `cells` are cleared;
+# force: always send these cells (for cells users edit by hand, like status flags)
+SheetUpdate = namedtuple("SheetUpdate", ["title", "cells", "region", "force"], defaults=(None, False))
+
+
+def grid_cells(rows, start_row=1, start_col=1):
+    """[[...], ...] -> {(row, col): value} starting at (start_row, start_col)."""
+    return {
+        (start_row + r, start_col + c): value
+        for r, row in enumerate(rows)
+        for c, value in enumerate(row)
+    }
+
+
+def cell_key(label):
+    """'D2' -> (2, 4)"""
+    from gspread.utils import a1_to_rowcol
+
+    return a1_to_rowcol(label)
+
+
+def _quote(title):
+    return "'" + title.replace("'", "''") + "'"
+
+
+def cells_to_ranges(title, cells):
+    """Group cells into rectangular A1 ranges: runs along each row, stacked when consecutive rows match."""
+    from gspread.utils import rowcol_to_a1
+
+    runs = []
+    for row, col in sorted(cells):
+        if runs and runs[-1][0] == row and runs[-1][2] == col - 1:
+            runs[-1][2] = col
+        else:
+            runs.append([row, col, col])
+
+    blocks = []  # [first_row, last_row, first_col, last_col]
+    for row, first_col, last_col in sorted(runs, key=lambda run: (run[1], run[2], run[0])):
+        if blocks and blocks[-1][1] == row - 1 and blocks[-1][2:] == [first_col, last_col]:
+            blocks[-1][1] = row
+        else:
+            blocks.append([row, row, first_col, last_col])
+
+    return [
+        {
+            "range": f"{_quote(title)}!{rowcol_to_a1(r1, c1)}:{rowcol_to_a1(r2, c2)}",
+            "values": [[cells[(r, c)] for c in range(c1, c2 + 1)] for r in range(r1, r2 + 1)],
+        }
+        for r1, r2, c1, c2 in blocks
+    ]
+
+
+class SheetWriter:
+    """Diff-only write-back layer.
+
+    Remembers the last grid written to each worksheet (seeded with one read the
+    first time a worksheet is written) and sends only changed cells, for all
+    worksheets of a spreadsheet, in a single values batch update. Nothing is
+    sent when nothing changed. If the spreadsheet was modified since our last
+    write (e.g. cells cleared or edited by hand), the remembered grids are
+    dropped and read again, so the next write repairs those cells.
+    """
+
+    def __init__(self, gateway):
+        self.gateway = gateway
+        self._grids = {}
+        self._modified = {}  # sheet name -> spreadsheet modifiedTime after our last write
+        self._lock = threading.Lock()
+
+    def _check_modified(self, sheet_name):
+        modified = self.gateway.last_modified(sheet_name)
+        if self._modified.get(sheet_name) != modified:
+            for key in [key for key in self._grids if key[0] == sheet_name]:
+                del self._grids[key]
+            self._modified[sheet_name] = modified
+
+    def _known(self, sheet_name, title):
+        key = (sheet_name, title)
+        if key not in self._grids:
+            rows = self.gateway.worksheet(sheet_name, title).get_all_values()
+            self._grids[key] = {cell: value for cell, value in grid_cells(rows).items() if value != ""}
+        return self._grids[key]
+
+    def _diff(self, sheet_name, update):
+        if update.force:
+            return dict(update.cells)
+        known = self._known(sheet_name, update.title)
+        changed = {cell: value for cell, value in update.cells.items() if known.get(cell, "") != value}
+        if update.region is not None:
+            first_row, first_col, last_col = update.region
+            for row, col in known:
+                in_region = row >= first_row and first_col <= col <= last_col
+                if in_region and (row, col) not in update.cells:
+                    changed[(row, col)] = ""
+        return changed
+
+    def write(self, sheet_name, updates, with_changes=()):
+        """Send the changed cells of `updates` in one request; returns the number of cells sent.
+
+        `with_changes` updates (e.g. a "last updated" timestamp) are only sent
+        when something in `updates` actually changed.
+        """
+        with self._lock:
+            self._check_modified(sheet_name)
+            changes = {}
+            data_changed = False
+            for update in updates:
+                changed = self._diff(sheet_name, update)
+                if changed:
+                    changes.setdefault(update.title, {}).update(changed)
+                    data_changed = data_changed or not update.force
+
+            if not changes:
+                print(f"No changes for '{sheet_name}', skipping write.")
+                return 0
+            if data_changed:
+                for update in with_changes:
+                    changes.setdefault(update.title, {}).update(update.cells)
+
+            data = []
+            for title, cells in changes.items():
+                data += cells_to_ranges(title, cells)
+            try:
+                self.gateway.spreadsheet(sheet_name).values_batch_update(
+                    {"valueInputOption": "RAW", "data": data}
+                )
+            except Exception:
+                for title in changes:  # the sheet may be partially written; re-read it next time
+                    self._grids.pop((sheet_name, title), None)
+                self._modified.pop(sheet_name, None)
+                raise
+
+            for title, cells in changes.items():
+                known = self._grids.setdefault((sheet_name, title), {})
+                for cell, value in cells.items():
+                    if value == "":
+                        known.pop(cell, None)
+                    else:
+                        known[cell] = value
+            try:
+                self._modified[sheet_name] = self.gateway.last_modified(sheet_name)
+            except Exception:  # the write went through; just re-read the grids next time
+                self._modified.pop(sheet_name, None)
+            return sum(len(cells) for cells in changes.values())
+
+
+_writers = weakref.WeakKeyDictionary()
+_writers_lock = threading.Lock()
+
+
+def get_sheet_writer(gateway=None):
+    """Return the writer bound to `gateway` (the shared gateway by default)."""
+    gateway = gateway or get_gateway()
+    with _writers_lock:
+        if gateway not in _writers:
+            _writers[gateway] = SheetWriter(gateway)
+        return _writers[gateway]
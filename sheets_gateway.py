@@ -0,0 +1,131 @@
+import threading
+from collections import Counter
+import metrics
+
+CREDENTIALS_FILE = "credentials.json"
+SCOPE = ["https://www.googleapis.com/auth/drive"]
+
+
+class SheetsGateway:
+    """Single authorized gspread client with cached Spreadsheet/Worksheet handles.
+
+    Authorization happens on first use; the authorized session refreshes the
+    access token lazily on the first request after it expires. Spreadsheets are
+    opened by name once (a Drive search) and reopened by key afterwards, and
+    every HTTP request the client makes is counted in `api_calls`.
+    """
+
+    def __init__(self, credentials_file=CREDENTIALS_FILE, scope=SCOPE, client=None):
+        self.credentials_file = credentials_file
+        self.scope = scope
+        self.api_calls = Counter()
+        self._client = None
+        self._keys = {}          # spreadsheet name -> key
+        self._spreadsheets = {}  # key -> Spreadsheet
+        self._worksheets = {}    # (key, worksheet title) -> Worksheet
+        self._lock = threading.RLock()
+        if client is not None:
+            self._set_client(client)
+
+    def _set_client(self, client):
+        self._client = client
+        http_client = getattr(client, "http_client", client)  # gspread 6 keeps the session on http_client
+        session = getattr(http_client, "session", None)
+        if session is None:
+            return
+        request = session.request
+
+        def counted_request(method, url, *args, **kwargs):
+            if "/drive/" in url:
+                self.api_calls["drive"] += 1
+            elif method.upper() == "GET":
+                self.api_calls["read"] += 1
+            else:
+                self.api_calls["write"] += 1
+            response = request(method, url, *args, **kwargs)
+            metrics.add(api_calls=1, bytes=len(response.content or b""))
+            return response
+
+        session.request = counted_request
+
+    @property
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                # Imported here so only the jobs that talk to Sheets pay for gspread/oauth2client
+                import gspread
+                from oauth2client.service_account import ServiceAccountCredentials
+
+                creds = ServiceAccountCredentials.from_json_keyfile_name(self.credentials_file, self.scope)
+                self._set_client(gspread.authorize(creds))
+            return self._client
+
+    # Handles are opened outside the lock (so regions open their sheets concurrently) and the
+    # first one stored wins if two threads opened the same sheet at once
+    def spreadsheet(self, sheet_name):
+        with self._lock:
+            key = self._keys.get(sheet_name)
+            if key is not None and key in self._spreadsheets:
+                return self._spreadsheets[key]
+        client = self.client
+        if key is not None:
+            spreadsheet = client.open_by_key(key)
+        else:
+            spreadsheet = client.open(sheet_name)  # Drive search, only on first open
+        with self._lock:
+            self._keys.setdefault(sheet_name, spreadsheet.id)
+            return self._spreadsheets.setdefault(spreadsheet.id, spreadsheet)
+
+    def worksheet(self, sheet_name, title):
+        spreadsheet = self.spreadsheet(sheet_name)
+        cache_key = (spreadsheet.id, title)
+        with self._lock:
+            if cache_key in self._worksheets:
+                return self._worksheets[cache_key]
+        worksheet = spreadsheet.worksheet(title)
+        with self._lock:
+            return self._worksheets.setdefault(cache_key, worksheet)
+
+    def last_modified(self, sheet_name):
+        """Drive's modifiedTime for the spreadsheet (one small metadata request)."""
+        spreadsheet = self.spreadsheet(sheet_name)
+        getter = getattr(spreadsheet, "get_lastUpdateTime", None)  # gspread 6
+        return getter() if getter else spreadsheet.lastUpdateTime
+
+    def invalidate(self, sheet_name=None):
+        """Drop cached handles (for one spreadsheet, or all) so the next lookup reopens them."""
+        with self._lock:
+            if sheet_name is None:
+                self._spreadsheets.clear()
+                self._worksheets.clear()
+                return
+            key = self._keys.get(sheet_name)
+            self._spreadsheets.pop(key, None)
+            for cache_key in [k for k in self._worksheets if k[0] == key]:
+                del self._worksheets[cache_key]
+
+    def drop_stale(self, sheet_name, error):
+        """Invalidate `sheet_name` if `error` means its cached handles may be stale (not found, API error)."""
+        import gspread
+
+        if isinstance(error, (gspread.exceptions.SpreadsheetNotFound, gspread.exceptions.WorksheetNotFound,
+                              gspread.exceptions.APIError)):
+            self.invalidate(sheet_name)
+            return True
+        return False
+
+    def total_api_calls(self):
+        return sum(self.api_calls.values())
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway():
+    """Return the process-wide sheets gateway shared by both scripts."""
+    global _gateway
+    with _gateway_lock:
+        if _gateway is None:
+            _gateway = SheetsGateway()
+        return _gateway
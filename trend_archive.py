@@ -0,0 +1,152 @@
+import bisect
+import os
+import threading
+import time
+from collections import namedtuple
+import numpy as np
+from change_detector import trend_name
+
+# Archive location and the default look-back of the velocity queries
+TREND_ARCHIVE_DIR = os.getenv("TREND_ARCHIVE_DIR", "trend_archive")
+VELOCITY_WINDOW_HOURS = int(os.getenv("VELOCITY_WINDOW_HOURS", "24"))
+
+# One fixed-size record per (snapshot, trend): 14 bytes, appended in timestamp order
+ROW_DTYPE = np.dtype([("ts", "<u4"), ("region", "<u4"), ("rank", "<u2"), ("trend", "<u4")])
+
+# velocity: ranks climbed per hour between the first and latest snapshot of the window (negative = falling);
+# start_rank/end_rank: rank in those snapshots (one past the bottom when absent);
+# time_in_list: share of the window's snapshots the trend appeared in
+TrendStat = namedtuple("TrendStat", ["name", "velocity", "start_rank", "end_rank", "time_in_list"])
+
+
+class TrendArchive:
+    """Append-only columnar store of every scraped trend list.
+
+    Rows live in a flat binary file of ROW_DTYPE records that is memory-mapped
+    for queries; region and trend names are interned through a string table
+    (one name per line, line number = id). Rows are appended in timestamp
+    order, so a time window is found with a binary search and everything after
+    that is vectorized.
+    """
+
+    def __init__(self, directory=TREND_ARCHIVE_DIR):
+        self.directory = directory
+        self.rows_path = os.path.join(directory, "rows.bin")
+        self.strings_path = os.path.join(directory, "strings.txt")
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+        self._strings = []
+        if os.path.exists(self.strings_path):
+            with open(self.strings_path, "r", encoding="utf-8") as file:
+                self._strings = file.read().split("\n")[:-1]
+        self._ids = {string: index for index, string in enumerate(self._strings)}
+
+        rows = self.rows()
+        self._last_ts = int(rows["ts"][-1]) if len(rows) else 0
+
+    def _intern(self, strings):
+        new = [string for string in dict.fromkeys(strings) if string not in self._ids]
+        if new:
+            # Strings are written before the rows that reference them
+            with open(self.strings_path, "a", encoding="utf-8") as file:
+                file.write("".join(f"{string}\n" for string in new))
+            for string in new:
+                self._ids[string] = len(self._strings)
+                self._strings.append(string)
+        return [self._ids[string] for string in strings]
+
+    def append(self, region, trends, timestamp=None):
+        """Store one ranked trend list (rank 1 first); returns the number of rows written."""
+        names = [" ".join(trend_name(trend).split()) for trend in trends]
+        names = [name for name in names if name]
+        if not names:
+            return 0
+        with self._lock:
+            # Keep the file sorted by time even if the clock steps back
+            ts = max(int(timestamp if timestamp is not None else time.time()), self._last_ts)
+            region_id, *trend_ids = self._intern([region] + names)
+            rows = np.zeros(len(names), dtype=ROW_DTYPE)
+            rows["ts"] = ts
+            rows["region"] = region_id
+            rows["rank"] = np.arange(1, len(names) + 1)
+            rows["trend"] = trend_ids
+            with open(self.rows_path, "ab") as file:
+                file.write(rows.tobytes())
+            self._last_ts = ts
+        return len(names)
+
+    def rows(self):
+        """Memory-mapped view of every row (read-only)."""
+        size = os.path.getsize(self.rows_path) if os.path.exists(self.rows_path) else 0
+        count = size // ROW_DTYPE.itemsize  # ignore a torn last record
+        if count == 0:
+            return np.zeros(0, dtype=ROW_DTYPE)
+        return np.memmap(self.rows_path, dtype=ROW_DTYPE, mode="r", shape=(count,))
+
+    def window(self, region, hours=VELOCITY_WINDOW_HOURS, now=None):
+        """Rows of `region` from the last `hours` hours."""
+        region_id = self._ids.get(region)
+        rows = self.rows()
+        if region_id is None or not len(rows):
+            return np.zeros(0, dtype=ROW_DTYPE)
+        now = time.time() if now is None else now
+        # Binary search straight on the mapped column (np.searchsorted would copy the strided field)
+        start = bisect.bisect_left(rows["ts"], max(0, int(now - hours * 3600)))
+        recent = rows[start:]
+        return np.asarray(recent[recent["region"] == region_id])
+
+    def trend_stats(self, region, hours=VELOCITY_WINDOW_HOURS, now=None):
+        """Per-trend arrays over the window: (trend ids, velocity, start_rank, end_rank, time_in_list)."""
+        rows = self.window(region, hours, now)
+        if not len(rows):
+            empty = np.zeros(0)
+            return empty.astype(np.uint32), empty, empty, empty, empty
+
+        snapshots = np.unique(rows["ts"])
+        bottom = int(rows["rank"].max()) + 1
+        ids, inverse = np.unique(rows["trend"], return_inverse=True)
+
+        start_rank = np.full(len(ids), bottom, dtype=np.float64)
+        end_rank = np.full(len(ids), bottom, dtype=np.float64)
+        at_start = rows["ts"] == snapshots[0]
+        at_end = rows["ts"] == snapshots[-1]
+        start_rank[inverse[at_start]] = rows["rank"][at_start]
+        end_rank[inverse[at_end]] = rows["rank"][at_end]
+
+        span_hours = max((int(snapshots[-1]) - int(snapshots[0])) / 3600, 1.0)
+        velocity = (start_rank - end_rank) / span_hours
+        time_in_list = np.bincount(inverse, minlength=len(ids)) / len(snapshots)
+        return ids, velocity, start_rank, end_rank, time_in_list
+
+    def _top(self, region, hours, limit, now, sign):
+        ids, velocity, start_rank, end_rank, time_in_list = self.trend_stats(region, hours, now)
+        moving = np.flatnonzero(sign * velocity > 0)
+        order = moving[np.argsort(-sign * velocity[moving], kind="stable")][:limit]
+        return [TrendStat(self._strings[ids[i]], round(float(velocity[i]), 3), int(start_rank[i]),
+                          int(end_rank[i]), round(float(time_in_list[i]), 3)) for i in order]
+
+    def risers(self, region, hours=VELOCITY_WINDOW_HOURS, limit=20, now=None):
+        """Trends that climbed fastest over the window, fastest first."""
+        return self._top(region, hours, limit, now, 1)
+
+    def fallers(self, region, hours=VELOCITY_WINDOW_HOURS, limit=20, now=None):
+        """Trends that dropped fastest over the window, fastest first."""
+        return self._top(region, hours, limit, now, -1)
+
+    def velocities(self, region, hours=VELOCITY_WINDOW_HOURS, now=None):
+        """{trend name: velocity} for every trend seen in the window."""
+        ids, velocity, *_ = self.trend_stats(region, hours, now)
+        return {self._strings[trend_id]: round(float(value), 3) for trend_id, value in zip(ids, velocity)}
+
+
+_archive = None
+_archive_lock = threading.Lock()
+
+
+def get_trend_archive():
+    global _archive
+    with _archive_lock:
+        if _archive is None:
+            _archive = TrendArchive()
+        return _archive
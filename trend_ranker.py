@@ -0,0 +1,196 @@
+import json
+import os
+import re
+import threading
+import numpy as np
+from arabic_text import canonical
+from change_detector import trend_name
+from metrics import instrumented
+
+# Pre-ranking settings (TREND_TOP_K=0 sends every trend to the model)
+TREND_TOP_K = int(os.getenv("TREND_TOP_K", "30"))
+TREND_BLOCKLIST_PATH = os.getenv("TREND_BLOCKLIST_PATH", "trend_blocklists.json")
+
+# Hashed character n-gram vectors
+NGRAM_SIZES = (2, 3)
+VECTOR_BITS = 12
+VECTOR_DIM = 2 ** VECTOR_BITS
+HASH_BASE = 1_000_003
+FIBONACCI_MULTIPLIER = 0x9E3779B97F4A7C15
+
+# Score = weighted best cosine match per tier + a small bonus for the trend's position on the page
+# + a bonus for climbing the list (rank velocity from the trend archive, squashed around MOMENTUM_SCALE ranks/hour)
+TIER_WEIGHTS = {"High": 1.0, "Medium": 0.5, "Low": -0.5}
+RANK_WEIGHT = 0.2
+MOMENTUM_WEIGHT = 0.3
+MOMENTUM_SCALE = 1.0
+
+NON_WORD_RE = re.compile(r"[\W_]+")
+
+
+def normalize(text):
+    """Canonical Arabic form (see arabic_text) with '#', '_' and punctuation turned into spaces."""
+    return " ".join(NON_WORD_RE.sub(" ", canonical(text)).split())
+
+
+def _ngram_buckets(texts):
+    """(row, bucket) of every character n-gram occurrence, sorted by row.
+
+    All texts are hashed at once: the padded texts are laid out as one array of
+    code points, each n-gram is folded into a polynomial hash with array
+    arithmetic and spread over the buckets with Fibonacci hashing. N-grams that
+    would span two texts are dropped.
+    """
+    padded = [f" {text} " for text in texts]
+    codes = np.frombuffer("".join(padded).encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    owner = np.repeat(np.arange(len(texts)), [len(text) for text in padded])
+    rows, buckets = [], []
+    for size in NGRAM_SIZES:
+        count = len(codes) - size + 1
+        hashed = np.zeros(count, dtype=np.uint64)
+        for offset in range(size):
+            hashed = hashed * np.uint64(HASH_BASE) + codes[offset:offset + count]
+        inside = owner[:count] == owner[size - 1:]
+        rows.append(owner[:count][inside])
+        buckets.append((hashed[inside] * np.uint64(FIBONACCI_MULTIPLIER)) >> np.uint64(64 - VECTOR_BITS))
+    rows, buckets = np.concatenate(rows), np.concatenate(buckets).astype(np.int64)
+    order = np.argsort(rows, kind="stable")
+    return rows[order], buckets[order]
+
+
+def ngram_vectors(texts):
+    """L2-normalized hashed character n-gram counts, one dense row per (normalized) text."""
+    rows, buckets = _ngram_buckets(texts)
+    matrix = np.zeros((len(texts), VECTOR_DIM), dtype=np.float32)
+    np.add.at(matrix, (rows, buckets), 1.0)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-9)
+
+
+def cosine_similarity(texts, vectors):
+    """Cosine similarity of every (non-empty, normalized) text against the rows of `vectors`.
+
+    The texts are never densified: each n-gram occurrence picks its column of
+    `vectors` and the picks are summed per text, so the cost grows with the
+    number of n-grams rather than texts x VECTOR_DIM.
+    """
+    rows, buckets = _ngram_buckets(texts)
+    cells, counts = np.unique(rows * VECTOR_DIM + buckets, return_counts=True)
+    norms = np.sqrt(np.bincount(cells // VECTOR_DIM, weights=counts.astype(np.float64) ** 2, minlength=len(texts)))
+    starts = np.searchsorted(rows, np.arange(len(texts)))
+    sums = np.add.reduceat(vectors.T[buckets], starts, axis=0)
+    return sums / np.maximum(norms, 1e-9)[:, None].astype(np.float32)
+
+
+def load_blocklists(path=TREND_BLOCKLIST_PATH):
+    """{category: [terms]} from a JSON file; a missing file means no blocklists."""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            blocklists = json.load(file)
+    except (json.JSONDecodeError, OSError) as e:
+        print(f"⚠️ Could not read trend blocklists ({e}), not blocking anything.")
+        return {}
+    return {category: [normalize(term) for term in terms if normalize(term)]
+            for category, terms in blocklists.items()}
+
+
+class TrendRanker:
+    """Scores trends against the historical keyword tiers and keeps the top K.
+
+    Trends matching a blocklist (sports, politics, personal names, ...) are
+    dropped first; the rest are scored against all tiers in one batched pass and the
+    best `top_k` are returned in their original page order.
+    """
+
+    def __init__(self, blocklists=None, top_k=TREND_TOP_K):
+        self.blocklists = load_blocklists() if blocklists is None else blocklists
+        self.top_k = top_k
+        self._vectors = {}  # keywords tuple -> tier matrix
+        self._lock = threading.Lock()
+        # One whole-word alternation per category
+        self._patterns = {
+            category: re.compile(r"(?<!\w)(?:" + "|".join(map(re.escape, terms)) + r")(?!\w)")
+            for category, terms in self.blocklists.items() if terms
+        }
+
+    def _keyword_vectors(self, keywords):
+        # The history only changes once a day, so keep each region's tier matrix
+        with self._lock:
+            if keywords not in self._vectors:
+                if len(self._vectors) >= 32:
+                    self._vectors.clear()
+                self._vectors[keywords] = ngram_vectors(keywords)
+            return self._vectors[keywords]
+
+    def blocked_category(self, text):
+        """Blocklist category a normalized trend falls in, or None."""
+        for category, pattern in self._patterns.items():
+            if pattern.search(text):
+                return category
+        return None
+
+    def scores(self, texts, historical_keywords, momentum=None):
+        """Score per normalized trend (higher is more relevant); all tiers in one matrix product.
+
+        `momentum` maps trend names to their rank velocity (ranks climbed per hour).
+        """
+        if not texts:
+            return np.zeros(0, dtype=np.float32)
+        keywords, weights, bounds = [], [], [0]
+        for tier, weight in TIER_WEIGHTS.items():
+            tier_keywords = [normalize(keyword) for keyword in historical_keywords.get(tier, [])]
+            keywords += [keyword for keyword in tier_keywords if keyword]
+            weights.append(weight)
+            bounds.append(len(keywords))
+
+        scores = RANK_WEIGHT * (1 - np.arange(len(texts), dtype=np.float32) / len(texts))
+        if keywords:
+            similarity = cosine_similarity(texts, self._keyword_vectors(tuple(keywords)))
+            for weight, start, end in zip(weights, bounds, bounds[1:]):
+                if end > start:
+                    scores += weight * similarity[:, start:end].max(axis=1)
+        if momentum:
+            velocity = {normalize(name): value for name, value in momentum.items()}
+            climbing = np.array([velocity.get(text, 0.0) for text in texts], dtype=np.float32)
+            scores += MOMENTUM_WEIGHT * np.tanh(climbing / MOMENTUM_SCALE)
+        return scores
+
+    def rank(self, trends, historical_keywords, momentum=None):
+        """Return (kept trends in page order, {category: blocked count})."""
+        texts = [normalize(trend_name(trend)) for trend in trends]
+        blocked = {}
+        candidates = []
+        for index, text in enumerate(texts):
+            category = self.blocked_category(text) if text else "empty"
+            if category:
+                blocked[category] = blocked.get(category, 0) + 1
+            else:
+                candidates.append(index)
+
+        if self.top_k and len(candidates) > self.top_k:
+            scores = self.scores([texts[index] for index in candidates], historical_keywords, momentum)
+            best = np.argpartition(-scores, self.top_k - 1)[:self.top_k]
+            candidates = sorted(candidates[position] for position in best)
+        return [trends[index] for index in candidates], blocked
+
+
+_ranker = None
+_ranker_lock = threading.Lock()
+
+
+def get_trend_ranker():
+    global _ranker
+    with _ranker_lock:
+        if _ranker is None:
+            _ranker = TrendRanker()
+        return _ranker
+
+
+@instrumented("rank_trends")
+def rank_trends(trends, historical_keywords, momentum=None):
+    """Drop blocklisted trends and keep the top-K most relevant ones before any prompt is built."""
+    kept, blocked = get_trend_ranker().rank(trends, historical_keywords, momentum)
+    print(f"Pre-ranker kept {len(kept)} of {len(trends)} trends (blocked: {blocked or 'none'}).")
+    return kept
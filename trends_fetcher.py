@@ -0,0 +1,109 @@
+from html.parser import HTMLParser
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import metrics
+
+TRENDS_URL = "https://getdaytrends.com/saudi-arabia/"
+REQUEST_TIMEOUT = 10
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml",
+    "Accept-Language": "ar,en;q=0.8",
+}
+
+_session = None
+
+
+def get_http_session():
+    """Return the process-wide pooled HTTP session (keep-alive, small retry budget)."""
+    global _session
+    if _session is None:
+        session = requests.Session()
+        retry = Retry(total=2, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504))
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update(HEADERS)
+        _session = session
+    return _session
+
+
+class TrendCellParser(HTMLParser):
+    """Collects the visible text of every <td class="main"> cell."""
+
+    BLOCK_TAGS = {"div", "p", "br", "li", "ul", "ol"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.cells = []
+        self._parts = None
+        self._depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if self._parts is None:
+            if tag == "td" and "main" in (dict(attrs).get("class") or "").split():
+                self._parts = []
+                self._depth = 1
+            return
+
+        if tag in ("td", "th", "tr") and self._depth == 1:
+            # <td> closed implicitly by the next cell or row
+            self._finish_cell()
+            self.handle_starttag(tag, attrs)
+        elif tag == "td":
+            self._depth += 1
+        elif tag in self.BLOCK_TAGS:
+            self._parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if self._parts is None:
+            return
+        if tag == "td":
+            self._depth -= 1
+            if self._depth == 0:
+                self._finish_cell()
+        elif tag in ("tr", "table"):
+            self._finish_cell()
+        elif tag in self.BLOCK_TAGS:
+            self._parts.append("\n")
+
+    def handle_data(self, data):
+        if self._parts is not None:
+            self._parts.append(data)
+
+    def _finish_cell(self):
+        lines = (" ".join(line.split()) for line in "".join(self._parts).split("\n"))
+        text = "\n".join(line for line in lines if line)
+        if text:
+            self.cells.append(text)
+        self._parts = None
+        self._depth = 0
+
+    def close(self):
+        super().close()
+        if self._parts is not None:
+            self._finish_cell()
+
+
+def parse_trends(html):
+    """Extract the text of the `td.main` cells, matching what Selenium's `.text` returns."""
+    parser = TrendCellParser()
+    parser.feed(html)
+    parser.close()
+    return parser.cells
+
+
+def fetch_trends(url=TRENDS_URL, session=None, timeout=REQUEST_TIMEOUT):
+    """Fetch the trends page over plain HTTP and parse it; returns [] on any failure."""
+    session = session or get_http_session()
+    try:
+        response = session.get(url, timeout=timeout)
+        metrics.add(api_calls=1, bytes=len(response.content))
+        if response.status_code != 200:
+            print(f"Failed to fetch trends page. Status code: {response.status_code}")
+            return []
+        return parse_trends(response.text)
+    except Exception as e:
+        print(f"Error fetching trends page: {e}")
+        return []